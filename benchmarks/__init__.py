@@ -0,0 +1,5 @@
+"""
+Benchmarks measure throughput of generating the schema shapes in benchmarks.shapes end to end,
+broken down by node type and stage, and compare them against a saved baseline.
+Run with python -m benchmarks, every case runs offline in its own process.
+"""
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+import os
+import sys
+import json
+import time
+import asyncio
+import resource
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from genesynth.orchestration import Orchestration, Instrument, BaseDataModel, reseed
+from benchmarks.shapes import SHAPES
+
+ROWS = (1000, 10000, 100000, 1000000, 10000000)
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks')
+parser.add_argument('--shape', nargs='+', choices=list(SHAPES), default=list(SHAPES), help='schema shapes benchmarked. defaults to all')
+parser.add_argument('--rows', nargs='+', type=int, default=ROWS[:2], help=f'row counts benchmarked, up to {ROWS[-1]:.0e}. defaults to {ROWS[:2]}')
+parser.add_argument('--seed', type=int, default=0, help='random seed of every case')
+parser.add_argument('-o', '--output', help='write results to this json file')
+parser.add_argument('--baseline', help='json file of results to compare against')
+parser.add_argument('--tolerance', type=float, default=0.2, help='fraction results may be worse than the baseline before failing')
+parser.add_argument('--case', nargs=2, metavar=('SHAPE', 'ROWS'), help=argparse.SUPPRESS)
+
+# higher is better for throughput, lower is better for memory
+METRICS = {'rows_per_second': 1, 'bytes_per_second': 1, 'peak_rss': -1}
+
+def peak_rss():
+    """return peak resident bytes of this process or of the largest worker process it waited for
+    """
+    return max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) * 1024
+
+def measure(shape: str, rows: int, seed: int = 0):
+    """generate shape with rows in this process and return its result
+    """
+    config = SHAPES[shape](rows)
+    reseed(seed)
+    instrument = Instrument(enabled=True)
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'output')
+        start = time.perf_counter()
+        pipe = Orchestration.read_dict(config, instrument=instrument)
+        pipe.run()
+        asyncio.run(pipe.root.save(output))
+        wall = time.perf_counter() - start
+        nbytes = os.path.getsize(output)
+    # seconds and rows per node type and stage, fixtures generating and data models merging
+    stages = defaultdict(lambda: [0.0, 0])
+    nodes = pipe.graph.index
+    for record in instrument.records:
+        stage = stages[f'{type(nodes[record.name]).__name__}.{record.stage}']
+        stage[0] += record.wall
+        stage[1] += record.rows
+    return {
+        'shape': shape,
+        'rows': rows,
+        'tables': sum(isinstance(node, BaseDataModel) for node in pipe.graph),
+        'wall': wall,
+        'bytes': nbytes,
+        'rows_per_second': rows / wall,
+        'bytes_per_second': nbytes / wall,
+        'peak_rss': peak_rss(),
+        'stages': {name: {'seconds': seconds, 'rows_per_second': count / seconds if seconds else None}
+                   for name, (seconds, count) in sorted(stages.items())},
+    }
+
+def run(shape: str, rows: int, seed: int = 0):
+    """return result of shape with rows measured in a new process, so peak memory is its own
+    """
+    cmd = [sys.executable, '-m', 'benchmarks', '--case', shape, str(rows), '--seed', str(seed)]
+    out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+def key(result):
+    return f'{result["shape"]}-{result["rows"]}'
+
+def compare(results, baseline, tolerance=0.2):
+    """return list of (case, metric, value, baseline value) worse than the baseline by more than tolerance
+    cases missing from the baseline are not compared
+    """
+    baseline = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        expected = baseline.get(key(result))
+        if expected is None:
+            continue
+        for metric, sign in METRICS.items():
+            value, base = result[metric], expected[metric]
+            if (sign > 0 and value < base * (1 - tolerance)) or (sign < 0 and value > base * (1 + tolerance)):
+                regressions.append((key(result), metric, value, base))
+    return regressions
+
+def report(results, fh=sys.stdout):
+    fh.write(f'{"case":<24} {"seconds":>10} {"rows/s":>12} {"bytes/s":>14} {"peak rss":>14}\n')
+    for result in results:
+        fh.write(f'{key(result):<24} {result["wall"]:>10.3f} {result["rows_per_second"]:>12.0f} '
+                 f'{result["bytes_per_second"]:>14.0f} {result["peak_rss"]:>14}\n')
+
+def main(shapes, rows, seed=0, output=None, baseline=None, tolerance=0.2):
+    results = [run(shape, n, seed=seed) for n in rows for shape in shapes]
+    report(results)
+    if output is not None:
+        with open(output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    if baseline is not None:
+        with open(baseline) as fh:
+            regressions = compare(results, json.load(fh), tolerance=tolerance)
+        for case, metric, value, base in regressions:
+            sys.stderr.write(f'{case} {metric} {value:.0f} is worse than baseline {base:.0f} by more than {tolerance:.0%}\n')
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.case:
+        shape, rows = args.case
+        print(json.dumps(measure(shape, int(rows), seed=args.seed)))
+    else:
+        sys.exit(main(args.shape, args.rows, seed=args.seed, output=args.output, baseline=args.baseline,
+                      tolerance=args.tolerance))
@@ -0,0 +1,64 @@
+"""
+Schema shapes benchmarked, every shape is a function of the number of rows returning the schema as a dict.
+"""
+
+import os
+from genesynth.io import load_configs, resize
+
+TESTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests')
+
+COLUMNS = [
+    {'type': 'serial', 'metadata': {'start': 0, 'step': 1}},
+    {'type': 'integer', 'metadata': {'min': 0, 'max': 1000, 'dist': {'normal': {'loc': 500, 'scale': 100}}}},
+    {'type': 'float', 'metadata': {'min': 0, 'max': 1}},
+    {'type': 'string'},
+    {'type': 'boolean'},
+    {'type': 'timestamp'},
+    {'type': 'enum', 'metadata': {'options': ['a', 'b', 'c']}},
+]
+
+def wide(rows: int, columns: int = 70):
+    """csv table of columns cycling through every column type
+    """
+    properties = {f'column{i}': dict(COLUMNS[i % len(COLUMNS)]) for i in range(columns)}
+    return {'type': 'table', 'metadata': {'size': rows, 'sep': ','}, 'properties': properties}
+
+def deep(rows: int, depth: int = 6):
+    """json nested depth levels deep with a few columns at every level
+    """
+    properties = {f'column{i}': dict(column) for i, column in enumerate(COLUMNS[1:4])}
+    for level in range(depth - 1, 0, -1):
+        properties = dict(properties, **{f'level{level}': {'type': 'json', 'properties': properties}})
+    return {'type': 'json', 'metadata': {'size': rows}, 'properties': properties}
+
+def foreign(rows: int, tables: int = 10):
+    """tables each referencing the serial id of a parent table and of the previous table
+    """
+    properties = {'parent': {'type': 'table', 'metadata': {'sep': ','}, 'properties': {
+        'id': {'type': 'serial', 'metadata': {'start': 0, 'step': 1}, 'constraints': ['incremental']},
+        'name': {'type': 'string'},
+    }}}
+    for i in range(tables):
+        properties[f'child{i}'] = {'type': 'table', 'metadata': {'sep': ','}, 'properties': {
+            'id': {'type': 'serial', 'metadata': {'start': 0, 'step': 1}, 'constraints': ['incremental']},
+            'parent_id': {'type': 'integer', 'metadata': {'foreign': {'name': 'parent.id'}}},
+            'previous_id': {'type': 'integer', 'metadata': {'foreign': {'name': f'child{i - 1}.id' if i else 'parent.id'}}},
+            'value': {'type': 'float', 'metadata': {'min': 0, 'max': 100}},
+        }}
+    return {'type': 'json', 'metadata': {'size': rows}, 'properties': properties}
+
+def bundled(filename):
+    """return shape scaling a schema bundled with the tests
+    """
+    def shape(rows: int):
+        return resize(load_configs(os.path.join(TESTS, filename)), rows)
+    shape.__doc__ = f'tests/{filename} with every size set to rows'
+    return shape
+
+SHAPES = {
+    'wide': wide,
+    'deep': deep,
+    'foreign': foreign,
+    'e_commerce': bundled('e_commerce.yaml'),
+    'care': bundled('care.yaml'),
+}
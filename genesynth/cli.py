@@ -1,31 +1,88 @@
 #!/usr/bin/env python
 import sys
 import os
+import json
 import argparse
 import asyncio
 from genesynth.orchestration import *
-from genesynth.utils import clean_text
+from genesynth import planner
+from genesynth.utils import stringify
 
 parser = argparse.ArgumentParser()
 parser.add_argument('-f', '--filename', required=True, nargs='+', help='schema file')
 parser.add_argument('-o', '--output', help='output filename if given. defaults to input filename without extension')
-parser.add_argument('--string', action='store_true', help='keep all type as string')
+parser.add_argument('--string', action='store_true', help='quote numbers and booleans as strings in json output')
 parser.add_argument('--stdout', action='store_true', help='DEPRECATED print output to stdout')
+parser.add_argument('--processes', type=int, help='number of worker process. defaults to cpu count')
+parser.add_argument('--threads', type=int, help='number of worker thread. defaults to 10')
+parser.add_argument('--seed', type=int, help='random seed for reproducible output')
+parser.add_argument('--shards', type=int, help='split rows into shards written as output.part-00000 files, requires output')
+parser.add_argument('--jobs', type=int, help='number of process generating shards. defaults to cpu count')
+parser.add_argument('--concat', action='store_true', help='concatenate shards into output')
+parser.add_argument('--cache', help='directory of the column cache kept across runs, only seeded runs are cached')
+parser.add_argument('--cache-size', type=int, help='bytes the column cache may take before least recently used columns are evicted')
+parser.add_argument('--incremental', help='directory kept between runs, only nodes changed since the previous run are generated again')
+parser.add_argument('--scratch', help='directory intermediate files are written to. defaults to the system temporary directory')
+parser.add_argument('--max-disk', type=int, help='bytes of intermediate files kept on disk at once, nodes wait for files to be freed')
+parser.add_argument('--max-memory', type=int, help='estimated bytes the nodes generated at once may hold in memory, nodes wait for others to finish')
+parser.add_argument('--plan', action='store_true', help='print estimated rows, memory, disk and time per node and table without generating')
+parser.add_argument('--plan-sample', type=int, default=1000, help='rows generated per fixture type to calibrate the time estimate of --plan')
+parser.add_argument('--report', help='write timing, throughput and memory of every node to this json file')
+parser.add_argument('--profile', choices=['cprofile', 'tracemalloc'], help='profile every node with cprofile or tracemalloc')
+parser.add_argument('--profile-output', default='genesynth.profile', help='file the merged profile report is written to')
+parser.add_argument('--plan-cache', help='file the execution plan is saved to and reused from while the schema is unchanged')
 
-def main(filename, output=None, string=False):
-    pipe = Orchestration.read_config(*filename)
-    pipe.run()
+def main(filename, output=None, string=False, seed=None, shards=None, jobs=None, concat=False, plan_cache=None,
+         cache=None, cache_size=None, incremental=None, scratch=None, max_disk=None,
+         max_memory=None, plan=False, plan_sample=1000, report=None,
+         profile=None, profile_output='genesynth.profile'):
+    if plan:
+        return planner.report(*planner.estimate(load_configs(*filename), sample=plan_sample))
+    if cache is not None:
+        cache = CacheCollection('genesynth', directory=cache, budget=cache_size)
+    if shards:
+        if output is None:
+            parser.error('--shards requires --output')
+        if incremental is not None:
+            parser.error('--shards does not support --incremental')
+        if report is not None:
+            parser.error('--shards does not support --report, shards run in separate processes')
+        if profile is not None:
+            parser.error('--shards does not support --profile, shards run in separate processes')
+        return run_shards(load_configs(*filename), output, shards, jobs=jobs, seed=seed, concat=concat, cache=cache,
+                          scratch=scratch, max_disk=max_disk, max_memory=max_memory)
+    instrument = Instrument(enabled=report is not None)
+    profiler = Profiler(profile) if profile else None
+    if incremental is not None:
+        if cache is not None or plan_cache is not None:
+            parser.error('--incremental keeps its own column cache and plan, it does not support --cache or --plan-cache')
+        pipe = run_incremental(load_configs(*filename), incremental, seed=seed, scratch=scratch, max_disk=max_disk,
+                               max_memory=max_memory, instrument=instrument, profiler=profiler)
+    else:
+        if seed is not None:
+            reseed(seed)
+        pipe = Orchestration.read_config(*filename, plan=plan_cache, cache=cache, scratch=scratch, max_disk=max_disk,
+                                          max_memory=max_memory, instrument=instrument,
+                                          profiler=profiler)
+        pipe.run()
+    if profiler is not None:
+        profiler.save(profile_output)
+    if report is not None:
+        with open(report, 'w') as fh:
+            json.dump(pipe.report(), fh, indent=2)
     if output is None:
         asyncio.run(pipe.root.save())
         with open(pipe.root._file) as fh:
             for line in fh:
-                if string:
-                    sys.stdout.write(line)
-                else:
-                    sys.stdout.write(clean_text(line))
+                sys.stdout.write(stringify(line) if string else line)
     else:
         asyncio.run(pipe.root.save(output))
 
 if __name__ == '__main__':
     args = parser.parse_args()
-    main(args.filename, args.output, args.string)
+    pools.configure(processes=args.processes, threads=args.threads)
+    main(args.filename, args.output, args.string, seed=args.seed, shards=args.shards, jobs=args.jobs, concat=args.concat,
+         plan_cache=args.plan_cache, cache=args.cache, cache_size=args.cache_size,
+         incremental=args.incremental, scratch=args.scratch, max_disk=args.max_disk,
+         max_memory=args.max_memory, plan=args.plan, plan_sample=args.plan_sample,
+         report=args.report, profile=args.profile, profile_output=args.profile_output)
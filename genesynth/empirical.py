@@ -0,0 +1,72 @@
+"""
+Empirical distributions fitted from a local sample file, used by dist: {empirical: {file, column}} and dist: {kde: {...}}.
+The sample is read once through a memory map and reduced to a tabulated inverse cdf, kept in memory
+and on disk under a key of the file and the fit parameters, so values are drawn in time independent of the sample size.
+"""
+
+import os
+import hashlib
+import tempfile
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from genesynth import mat
+
+METHODS = ('empirical', 'kde')
+DIRECTORY = os.path.join(tempfile.gettempdir(), 'genesynth_dist')
+
+def read_sample(file, column=None):
+    """return values of column in a .npy or csv file as float, datetimes as nanoseconds since epoch
+    column is a field name or index of a .npy file and a header name or index of a csv file with header,
+    the first one if not given
+    """
+    if file.endswith('.npy'):
+        arr = np.load(file, mmap_mode='r')
+        if arr.dtype.names:
+            arr = arr[column or arr.dtype.names[0]]
+        elif arr.ndim > 1:
+            arr = arr[:, column or 0]
+    else:
+        arr = pd.read_csv(file, usecols=[column or 0], memory_map=True).iloc[:, 0]
+        if arr.dtype.kind == 'O':
+            arr = pd.to_datetime(arr)
+        arr = arr.dropna().values
+    if arr.dtype.kind == 'M':
+        arr = arr.astype('datetime64[ns]').astype(np.int64)
+    return np.asarray(arr, dtype=float)
+
+def fit_key(method, file, column=None, **params):
+    """return digest of the sample file, its size and modification time and the fit parameters
+    """
+    stat = os.stat(file)
+    key = (method, os.path.abspath(file), stat.st_size, stat.st_mtime_ns, column, tuple(sorted(params.items())))
+    return hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+
+def build(method, sample, **params):
+    if method == 'kde':
+        return mat.kde_table(sample, bw=params.get('bandwidth'), size=params.get('size', mat.TABLE_SIZE))
+    return mat.empirical_table(sample, size=params.get('size', mat.TABLE_SIZE))
+
+@lru_cache(maxsize=64)
+def load(method, file, column, key, directory, params):
+    filename = os.path.join(directory, f'{key}.npz')
+    if os.path.isfile(filename):
+        with np.load(filename) as data:
+            return mat.InverseCDF(data['grid'], data['values'], data['guide'])
+    table = build(method, read_sample(file, column), **dict(params))
+    os.makedirs(directory, exist_ok=True)
+    # written under a temporary name first, so concurrent runs never read a partial file
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.npz')
+    with os.fdopen(fd, 'wb') as fh:
+        np.savez(fh, **table._asdict())
+    os.replace(tmp, filename)
+    return table
+
+def fit(method, file, column=None, directory=None, **params):
+    """return InverseCDF of the empirical or kernel density distribution of column in file
+    params of kde are bandwidth, defaults to silverman's rule of thumb, and size of the table
+    """
+    assert method in METHODS, f'dist should be one of {METHODS}, got {method}'
+    assert os.path.isfile(file), f'sample file {file} does not exist'
+    key = fit_key(method, file, column, **params)
+    return load(method, file, column, key, directory or DIRECTORY, tuple(sorted(params.items())))
@@ -12,6 +12,7 @@ from genesynth.extensions import extensions
 class BaseGenaiFixture(BaseMask):
     base_url = None
     env_var = 'OPENAI_API_KEY'
+    rate = 1.0 # a completion request per row is never made while planning, overridden by rate metadata
 
     prompt: str
     model: str = 'gpt-4o-mini'
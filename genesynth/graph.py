@@ -4,8 +4,14 @@ Note that this is not intended to optimize processing order of operatsions and o
 The graph is required to be able to evaluate the dependency in isolation; this means no business logic.
 """
 
+import os
 import enum
+import json
+import typing
+import hashlib
+import itertools
 import networkx as nx
+from types import MappingProxyType
 from genesynth import utils
 
 class Node(enum.Enum):
@@ -21,19 +27,67 @@ class Relationship(enum.Enum):
     identity = 4 # node contains exact copy of parent
     incremental = 5 # node contains increasing value as parent
 
+def node_name(node):
+    return getattr(node, 'name', node)
+
+def index(G):
+    """return the fully qualified name to node index kept in the graph attributes, built on first use
+    """
+    if 'index' not in G.graph:
+        G.graph['index'] = {node_name(n): n for n in G.nodes}
+    return G.graph['index']
+
 def find_node(G, name):
+    node = index(G).get(name)
+    if node is not None and node in G:
+        return node
+    # subgraph views share the index of the whole graph, and nodes added without it are found by scan
     for n in G.nodes:
-        if n.name == name:
+        if node_name(n) == name:
+            index(G)[name] = n
             return n
 
 def find_child_node(G, parent, *children):
-    node = find_node(G, parent)
-    g = G.subgraph(nx.descendants(G, node))
-    for child in children:
-        parent = f'{parent}.{child}'
-        node = find_node(g, parent) 
-        g = G.subgraph(nx.descendants(g, node))
-    return node
+    return find_node(G, '.'.join((parent,) + children))
+
+class Plan(typing.NamedTuple):
+    """
+    Immutable execution plan of a graph, every node referred to by its fully qualified name.
+    levels groups the nodes so that a node only depends on nodes of earlier levels,
+    dependencies lists the nodes each node waits on and consumers the nodes waiting on it,
+    so the cache of a node can be freed once len(consumers) of them are written.
+    key identifies the graph the plan was compiled from.
+    """
+    name: str
+    key: str
+    levels: tuple
+    dependencies: typing.Mapping[str, tuple]
+    consumers: typing.Mapping[str, tuple]
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(name=data['name'], key=data['key'],
+                   levels=tuple(tuple(level) for level in data['levels']),
+                   dependencies=MappingProxyType({k: tuple(v) for k, v in data['dependencies'].items()}),
+                   consumers=MappingProxyType({k: tuple(v) for k, v in data['consumers'].items()}))
+
+    def to_dict(self):
+        return {'name': self.name, 'key': self.key, 'levels': self.levels,
+                'dependencies': dict(self.dependencies), 'consumers': dict(self.consumers)}
+
+    @property
+    def order(self):
+        return tuple(itertools.chain.from_iterable(self.levels))
+
+    def save(self, filename):
+        with open(filename, 'w') as fh:
+            json.dump(self.to_dict(), fh)
+        return filename
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as fh:
+            return cls.from_dict(json.load(fh))
 
 class Graph:
     """
@@ -45,6 +99,7 @@ class Graph:
         self.name = name
         self.attr = attr
         self.ref = ref
+        self.plans = {}
 
     def subgraph(self, nodes):
         return self.G.subgraph(nodes)
@@ -72,6 +127,10 @@ class Graph:
     def filter(self, **attrs):
         return self.subgraph({n for n, d in self.G.nodes(data=True) if d.items() >= attrs.items()})
 
+    @property
+    def index(self):
+        return index(self.G)
+
     def find_node(self, name):
         return find_node(self.G, name)
 
@@ -116,13 +175,11 @@ class Graph:
     #            yield node, arr
 
     def __iter__(self):
-        for degree, nodes in self.degree_search():
-            for node in nodes:
-                # TODO reverse order this iter
-                for n in self.parents(node).nodes:
-                    # TODO This needs to be fixed
-                    yield n
-                yield node
+        """yield every node once, after all nodes it depends on
+        """
+        nodes = self.index
+        for name in self.compile().order:
+            yield nodes[name]
 
     async def generate(self):
         return set(self)
@@ -131,6 +188,51 @@ class Graph:
     def centrality(self):
         return nx.eigenvector_centrality(self.G)
 
+    def dependencies(self, nodes=None):
+        """return graph of processing order with an edge from each node to the nodes waiting on it,
+        a parent waits on its children and a foreign key waits on the node it refers to
+        """
+        nodes = set(self.G.nodes if nodes is None else nodes)
+        D = nx.DiGraph()
+        D.add_nodes_from(nodes)
+        for parent, child, attr in self.G.edges(data=True):
+            edge = (parent, child) if attr.get('type') == 'fkey' else (child, parent)
+            if nodes.issuperset(edge):
+                D.add_edge(*edge)
+        if not nx.is_directed_acyclic_graph(D):
+            raise ValueError(f'{self.name} has circular dependency {nx.find_cycle(D)}')
+        return D
+
+    def key(self, nodes=None):
+        """return digest of the node names and edges among nodes, which is all a plan depends on
+        """
+        nodes = set(self.G.nodes if nodes is None else nodes)
+        names = sorted(node_name(n) for n in nodes)
+        edges = sorted((node_name(u), node_name(v), attr.get('type', '')) for u, v, attr in self.G.edges(data=True)
+                       if u in nodes and v in nodes)
+        return hashlib.md5(json.dumps([self.name, names, edges]).encode('utf-8')).hexdigest()
+
+    def compile(self, nodes=None, filename=None):
+        """return the execution plan of nodes, analysed once per graph
+        a plan saved to filename is reused while the graph has not changed, otherwise it is compiled and saved again
+        """
+        key = self.key(nodes)
+        if key in self.plans:
+            return self.plans[key]
+        plan = None
+        if filename is not None and os.path.isfile(filename):
+            plan = Plan.load(filename)
+        if plan is None or plan.key != key:
+            D = self.dependencies(nodes)
+            plan = Plan(name=self.name, key=key,
+                        levels=tuple(tuple(sorted(map(node_name, level))) for level in nx.topological_generations(D)),
+                        dependencies=MappingProxyType({node_name(n): tuple(sorted(map(node_name, D.predecessors(n)))) for n in D}),
+                        consumers=MappingProxyType({node_name(n): tuple(sorted(map(node_name, D.successors(n)))) for n in D}))
+            if filename is not None:
+                plan.save(filename)
+        self.plans[key] = plan
+        return plan
+
     def transitive_closure(self):
         return nx.dag.transitive_closure(self.G)
 
@@ -0,0 +1,80 @@
+"""
+Instrument records how every node was generated, written and merged: wall and cpu time, rows, bytes written,
+growth of the peak memory of the process and the executor that ran it.
+Records are only taken while enabled, a disabled instrument costs one attribute check per call.
+"""
+
+import time
+import resource
+import typing
+from contextlib import nullcontext
+from genesynth import store
+
+class Record(typing.NamedTuple):
+    name: str
+    stage: str # generate, write, merge or cache
+    executor: str # asyncio, thread or process
+    wall: float # seconds
+    cpu: float # cpu seconds of the thread that ran the stage, None if it ran in another process
+    rows: int
+    bytes: int # bytes of the cache file written
+    memory: int # bytes the peak resident memory of the process grew by
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.wall if self.wall else None
+
+    def to_dict(self):
+        return dict(self._asdict(), rows_per_second=self.rows_per_second)
+
+def peak_memory():
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class Measure:
+    """
+    Context manager timing one stage of a node in the thread it is entered in.
+    """
+    def __init__(self, instrument, node, stage, executor):
+        self.instrument = instrument
+        self.node = node
+        self.stage = stage
+        self.executor = executor
+
+    def __enter__(self):
+        self.memory = peak_memory()
+        self.cpu = time.thread_time() if self.executor != 'process' else None
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu if self.cpu is not None else None
+        start, stop = self.node.span
+        nbytes = store.nbytes(self.node._file) if self.node._file else 0
+        self.instrument.records.append(Record(self.node.name, self.stage, self.executor, wall, cpu, stop - start,
+                                              nbytes, peak_memory() - self.memory))
+
+class Instrument:
+    """
+    Collects a Record per stage of every node measured while enabled.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.records = []
+
+    def measure(self, node, stage, executor):
+        if not self.enabled:
+            return nullcontext()
+        return Measure(self, node, stage, executor)
+
+    def call(self, node, stage, executor, fn, *args, **kwargs):
+        """return fn(*args, **kwargs) measured in the thread it runs in
+        """
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        with Measure(self, node, stage, executor):
+            return fn(*args, **kwargs)
+
+    def report(self):
+        return [record.to_dict() for record in self.records]
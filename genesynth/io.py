@@ -3,10 +3,12 @@ IO is the utility library that manages how config and data gets loaded into the
 """
 
 import os
+import shutil
 import logging
 import yaml
 import gzip
 import json
+import glob
 import functools
 import yaml
 import tempfile
@@ -14,6 +16,7 @@ import networkx as nx
 import numpy as np
 from mergedeep import merge, Strategy
 from genesynth.utils import Hashabledict
+from genesynth.store import OFFSETS, MASK
 from genesynth.extensions import datatypes
 from genesynth.constraints import *
 
@@ -36,6 +39,18 @@ def load_configs(*args):
         configs.append(load_config(filename))
     return merge(*configs, strategy=Strategy.REPLACE)
 
+def resize(config: dict, rows: int, cap=False):
+    """return copy of config with every size set to rows, or capped at rows if cap
+    """
+    config = dict(config)
+    if isinstance(config.get('metadata'), dict) and config['metadata'].get('size'):
+        size = min(int(config['metadata']['size']), rows) if cap else rows
+        config['metadata'] = dict(config['metadata'], size=size)
+    if isinstance(config.get('properties'), dict):
+        config['properties'] = {key: resize(value, rows, cap=cap) if isinstance(value, dict) else value
+                                for key, value in config['properties'].items()}
+    return config
+
 def load_config(filename):
     if filename.endswith('json'):
         with open(filename) as fh:
@@ -53,6 +68,17 @@ def write_as_gzip(fh_obj, filename):
         for line in fh_obj:
             fh.write(line)
 
+def concat_files(filenames, filename, remove=False):
+    """append files into filename byte for byte, gzip parts make up a valid multi member gzip
+    """
+    with open(filename, 'wb') as fh:
+        for name in filenames:
+            with open(name, 'rb') as part:
+                shutil.copyfileobj(part, fh)
+            if remove:
+                os.remove(name)
+    return filename
+
 def write_as_json(fh_obj, filename, header=False):
     with open(filename, 'w') as fh:
         if isinstance(fh_obj, str):
@@ -95,7 +121,7 @@ def schema_to_graph(G, fullname, params, size=0, root='root'):
     elif type.startswith('[') and type.endswith(']'):
         type = type.strip('[]')
         container = 'array'
-    metadata = params.get('metadata', {})
+    metadata = dict(params.get('metadata', {}))
     metadata['size'] = metadata.get('size') or size
     metadata['sep'] = metadata.get('sep', '')
     foreign = metadata.pop('foreign', None)
@@ -127,18 +153,115 @@ def schema_to_graph(G, fullname, params, size=0, root='root'):
         for child in children.values():
             G.add_edge(node, child) # add relationship type here
     G.add_node(node, label=fullname, xlabel=name, _id=fullname, type=type, metadata=metadata) # convert constraints into attributes
+    G.graph.setdefault('index', {})[fullname] = node
     return node
 
+def link(src, dst):
+    """hard link src to dst, copy if the filesystem can not link
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
 class CacheCollection:
-    def __init__(self, name):
+    """
+    Content addressed store of cache files, an entry holds the file of a node with its offset and mask index
+    under the cache key of the node. The store persists in directory across runs and processes,
+    a temporary directory is used if none is given. Files are hard linked in and out of the store when possible.
+    Least recently used entries are evicted once the entries take more than budget bytes.
+    """
+    files = ('data', 'data' + OFFSETS, 'data' + MASK)
+
+    def __init__(self, name, directory=None, budget=None):
         self.name = name
-        self.dir = tempfile.TemporaryDirectory(prefix=f'{name}_')
+        self.budget = budget
+        if directory is None:
+            self.dir = tempfile.TemporaryDirectory(prefix=f'{name}_')
+            self.directory = self.dir.name
+        else:
+            self.dir = None
+            self.directory = directory
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def __contains__(self, key):
+        return key is not None and os.path.isdir(self.path(key))
+
+    def get(self, key, filename):
+        """link the entry of key to filename, return False on a miss
+        """
+        path = self.path(key)
+        try:
+            # last access time of the entry for lru eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        for name, suffix in zip(self.files, ('', OFFSETS, MASK)):
+            if os.path.isfile(os.path.join(path, name)):
+                link(os.path.join(path, name), filename + suffix)
+        return True
+
+    def put(self, key, filename):
+        """add filename with its index files as the entry of key, an existing entry is kept
+        """
+        path = self.path(key)
+        if os.path.isdir(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f'.{key}_', dir=os.path.dirname(path))
+        for name, suffix in zip(self.files, ('', OFFSETS, MASK)):
+            if os.path.isfile(filename + suffix):
+                link(filename + suffix, os.path.join(tmp, name))
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # written by another process in the meantime
+            shutil.rmtree(tmp)
+        if self.budget is not None:
+            self.evict(self.budget)
+        return path
+
+    def entries(self):
+        """return (last access time, bytes, path) of every entry
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*', '*')):
+            if os.path.basename(path).startswith('.'):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+                entries.append((os.path.getmtime(path), size, path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def evict(self, budget):
+        """remove least recently used entries until the rest fits in budget bytes
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= budget:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def prune(self, keys):
+        """remove every entry whose key is not in keys
+        """
+        keys = set(keys)
+        for _, _, path in self.entries():
+            if os.path.basename(path) not in keys:
+                shutil.rmtree(path, ignore_errors=True)
 
     def cache(self, fn):
         async def wrapped(obj, *args, **kwargs):
             if obj._file is None:
                 arr = await fn(obj, *args, **kwargs)
-                obj._file = os.path.join(self.dir.name, f'{obj.name}.gz')
+                obj._file = os.path.join(self.directory, f'{obj.name}.gz')
                 await obj.write(arr)
                 return arr
             else:
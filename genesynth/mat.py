@@ -4,6 +4,9 @@ Mat contains all matrix and masking operations that meets the constraint needs.
 
 import logging
 import enum
+import typing
+import hashlib
+from functools import lru_cache
 import numpy as np
 from scipy import stats
 
@@ -19,7 +22,75 @@ class StatsModel(enum.Enum):
     cosine = stats.cosine
     fisher = stats.f
     power_law = stats.powerlaw
-    bootstrap = stats.bootstrap
+
+CHUNK_SIZE = 2 ** 16
+# points the inverse cdf is first tabulated at, and error allowed as fraction of the value range before it is refined
+TABLE_SIZE = 2 ** 12 + 1
+ACCURACY = 1e-6
+# stands in for the seed when none is given, drawn once per process and inherited by forked workers
+ENTROPY = np.random.SeedSequence().entropy
+
+def rng(seed, *keys, block: int = 0):
+    """return counter based generator for a block of rows of the stream named by keys
+    Philox is keyed by a hash of (seed, keys) and its counter starts at the block index in the top word,
+    so every block is its own stream that can be drawn in isolation, in any order and on any process
+    """
+    seed = ENTROPY if seed is None else seed
+    digest = hashlib.blake2b(repr((seed,) + keys).encode('utf-8'), digest_size=16).digest()
+    key = np.frombuffer(digest, dtype=np.uint64)
+    return np.random.Generator(np.random.Philox(key=key, counter=[0, 0, 0, block]))
+
+def chunks(size: int, chunk_size: int = CHUNK_SIZE, start: int = 0):
+    """return (start, stop) row ranges that split rows [start, size) into blocks of chunk_size
+    """
+    for start in range(start, size, chunk_size):
+        yield start, min(start + chunk_size, size)
+
+def blocks(start: int, stop: int, size: int, chunk_size: int = CHUNK_SIZE):
+    """return (block, block start, block stop) of the fixed chunk_size row blocks of a size-row column
+    that overlap rows [start, stop)
+    """
+    return [(block, block * chunk_size, min((block + 1) * chunk_size, size))
+            for block in range(start // chunk_size, -(-stop // chunk_size))]
+
+def linspace(low, high, size: int, start: int = 0, stop: int = None, dtype=None):
+    """return rows [start, stop) of np.linspace(low, high, size) without building the whole array
+    integer dtype is floored the same way as np.linspace
+    """
+    stop = size if stop is None else stop
+    step = (high - low) / max(size - 1, 1)
+    arr = np.arange(start, stop) * step + low
+    if size > 1 and stop == size and stop > start:
+        arr[-1] = high
+    if dtype is not None and np.issubdtype(dtype, np.integer):
+        return np.floor(arr).astype(dtype)
+    return arr
+
+def order_bounds(size: int, chunk_size: int = CHUNK_SIZE, rng=np.random):
+    """return the lower and upper bound of every chunk_size block of a sorted uniform sample of size values
+    the order statistic at every block boundary is drawn up front, as
+        U(r_k) = 1 - prod(1 - Beta(r_j - r_j-1, size - r_j + 1)) over the boundaries j <= k
+    so each block only needs to sort its own rows between the two boundaries
+    """
+    ranks = np.arange(chunk_size, size, chunk_size)
+    bounds = 1 - np.cumprod(1 - rng.beta(np.diff(ranks, prepend=0), size - ranks + 1))
+    return np.concatenate([[0.], bounds]), np.concatenate([bounds, [1.]])
+
+def sorted_block(low: float, high: float, size: int, last=False, rng=np.random):
+    """return size sorted uniform values between low and high,
+    ending with the boundary high unless it is the last block
+    """
+    if last:
+        return low + (high - low) * np.sort(rng.random(size))
+    arr = low + (high - low) * np.sort(rng.random(size - 1))
+    return np.append(arr, high)
+
+def sorted_uniform(size: int, chunk_size: int = CHUNK_SIZE, rng=np.random):
+    """yield a sorted uniform sample of size values in blocks of chunk_size
+    """
+    lows, highs = order_bounds(size, chunk_size, rng=rng)
+    for i, (start, stop) in enumerate(chunks(size, chunk_size)):
+        yield sorted_block(lows[i], highs[i], stop - start, last=stop == size, rng=rng)
 
 def identity(size: int, matmul=False):
     """return index array that will produce identical array
@@ -36,7 +107,7 @@ def unique(arr: np.array):
     """
     return np.unique(arr)
 
-def sample(size: int, options, replace=True):
+def sample(size: int, options, replace=True, rng=np.random):
     """return sampled value from options
     if options is a dict, sampling probability distribution will be 
         generated from normalizing the value from options, otherwise 
@@ -48,7 +119,21 @@ def sample(size: int, options, replace=True):
         options = list(options)
     else:
         p = None
-    return np.random.choice(options, size, replace=replace, p=p)
+    return rng.choice(options, size, replace=replace, p=p)
+
+def sample_quantile(p: np.array, options):
+    """return option at cumulative probability p of the sampling distribution
+    options are ordered so that sorted p returns sorted values
+    """
+    if isinstance(options, dict):
+        keys = sorted(options)
+        weights = np.array([options[k] for k in keys], dtype=float)
+    else:
+        keys = sorted(options)
+        weights = np.ones(len(keys))
+    cdf = np.cumsum(weights) / weights.sum()
+    index = np.minimum(np.searchsorted(cdf, p, side='right'), len(keys) - 1)
+    return np.array(keys)[index]
 
 def mask(arr: np.array, low, high=None):
     """return index of input value against the array
@@ -67,10 +152,10 @@ def mask_index(arr: np.array, low, high=None):
     else:
         return np.where(arr==low, True, False)
 
-def null_percent(size: int, percent: float = 0.):
+def null_percent(size: int, percent: float = 0., rng=np.random):
     """return masking array for null value drawn from a binomial distribution.
     """
-    return np.random.binomial(1, percent/100., size) == 1
+    return rng.binomial(1, percent/100., size) == 1
 
 def nullable(arr, percent=0, mask=None, null=''):
     """return masked array with null being the fill_value
@@ -123,21 +208,212 @@ def stats_model(*args, model: str = 'uniform', **kwargs):
     else:
         return StatsModel(model).value(*args, **kwargs)
 
-def stats_model_generate(size: int, min: float, max: float, *args, model: str = 'uniform', unique=False, **kwargs):
-    """return array based on the statistical distribution
-       parameters to the model can be passed in as ordered or key-word wildcards 
+def hashable(*args):
+    try:
+        hash(tuple(arg if not isinstance(arg, dict) else tuple(arg.items()) for arg in args))
+        return True
+    except TypeError:
+        return False
+
+@lru_cache(maxsize=256)
+def frozen_model(model, args: tuple = (), kwargs: tuple = ()):
+    """return memoized frozen stats model, kwargs given as sorted items
+    """
+    return stats_model(*args, model=model, **dict(kwargs))
+
+def truncated_model(min: float, max: float, *args, model: str = 'uniform', **kwargs):
+    """return frozen stats model with the cumulative probability of min and max
     """
     if model == 'uniform':
-        m = stats_model(min, max, *args, model=model)
+        args, kwargs = (min, max) + args, {}
+    if hashable(args, kwargs):
+        m = frozen_model(model, args, tuple(sorted(kwargs.items())))
     else:
         m = stats_model(*args, model=model, **kwargs)
-    p99_low, p99_high = m.interval(0.99)
-    p_low, p_high = m.cdf(min), m.cdf(max)
+    return m, m.cdf(min), m.cdf(max)
+
+def is_discrete(model):
+    m = StatsModel[model] if isinstance(model, str) else StatsModel(model)
+    return isinstance(m.value, stats.rv_discrete)
+
+class DiscreteInverseCDF(typing.NamedTuple):
+    """
+    Exact inverse cdf of a discrete model over its support between min and max, cdf normalized to [0, 1].
+    """
+    cdf: np.ndarray
+    values: np.ndarray
+
+    def __call__(self, p: np.array):
+        idx = np.searchsorted(self.cdf, p, side='left')
+        return self.values[np.minimum(idx, len(self.values) - 1)]
+
+class InverseCDF(typing.NamedTuple):
+    """
+    Inverse cdf tabulated at increasing probabilities grid in [0, 1] with a guide index of the grid point
+    below every one of len(guide) evenly spaced probabilities, so lookups skip the binary search.
+    """
+    grid: np.ndarray
+    values: np.ndarray
+    guide: np.ndarray
+
+    def __call__(self, p: np.array):
+        """return linear interpolation of the table at p in [0, 1], monotone in p
+        """
+        p = np.asarray(p, dtype=float)
+        n = len(self.grid) - 2
+        idx = self.guide[np.clip((p * len(self.guide)).astype(np.intp), 0, len(self.guide) - 1)]
+        # grid points refined into the bucket of p, only tails of the table have more than one
+        todo = np.flatnonzero((idx < n) & (self.grid[idx + 1] <= p))
+        while len(todo):
+            idx[todo] += 1
+            todo = todo[(idx[todo] < n) & (self.grid[idx[todo] + 1] <= p[todo])]
+        low, high = self.grid[idx], self.grid[idx + 1]
+        return self.values[idx] + (p - low) / (high - low) * (self.values[idx + 1] - self.values[idx])
+
+    @classmethod
+    def from_values(cls, grid: np.array, values: np.array, guide: int = 4 * TABLE_SIZE):
+        """return table of values at increasing grid from 0 to 1 with a guide of guide buckets
+        """
+        idx = np.searchsorted(grid, np.arange(guide) / guide, side='right') - 1
+        return cls(grid, values, np.minimum(idx, len(grid) - 2))
+
+def tabulate_discrete(m, p_low: float, p_high: float, max_size: int = 2 ** 20):
+    """return DiscreteInverseCDF of m between p_low and p_high, None if its support is too large to tabulate
+    """
+    low, high = m.ppf(p_low), m.ppf(p_high)
+    if not (np.isfinite(low) and np.isfinite(high)) or high - low >= max_size:
+        return None
+    values = np.arange(low, high + 1)
+    return DiscreteInverseCDF((m.cdf(values) - p_low) / ((p_high - p_low) or 1), values)
+
+def tabulate(m, p_low: float, p_high: float, accuracy: float = ACCURACY, size: int = TABLE_SIZE, depth: int = 20):
+    """return InverseCDF of m between p_low and p_high, None if it is not finite
+       intervals are halved until linear interpolation at their midpoint is within accuracy of the value range
+    """
+    grid = np.linspace(0, 1, size)
+    values = m.ppf(grid * (p_high - p_low) + p_low)
+    if not np.isfinite(values).all():
+        return None
+    tolerance = accuracy * ((values[-1] - values[0]) or 1)
+    for _ in range(depth):
+        mid = (grid[:-1] + grid[1:]) / 2
+        exact = m.ppf(mid * (p_high - p_low) + p_low)
+        idx = np.flatnonzero(np.abs(exact - (values[:-1] + values[1:]) / 2) > tolerance)
+        if not len(idx):
+            break
+        grid = np.insert(grid, idx + 1, mid[idx])
+        values = np.insert(values, idx + 1, exact[idx])
+    return InverseCDF.from_values(grid, values, guide=4 * size)
+
+def empirical_table(sample: np.array, size: int = TABLE_SIZE):
+    """return InverseCDF of the sample, its quantiles at size evenly spaced probabilities
+       values are uniform between neighbouring quantiles, a histogram with bins of equal count
+    """
+    grid = np.linspace(0, 1, size)
+    return InverseCDF.from_values(grid, np.quantile(sample, grid))
+
+def bandwidth(sample: np.array):
+    """return silverman's rule of thumb bandwidth of a gaussian kernel over the sample
+    """
+    low, high = np.quantile(sample, [0.25, 0.75])
+    scale = np.std(sample)
+    if high > low:
+        scale = min(scale, (high - low) / 1.34)
+    return 0.9 * (scale or 1) * len(sample) ** -0.2
+
+def kde_table(sample: np.array, bw: float = None, size: int = TABLE_SIZE, centers: int = 1024):
+    """return InverseCDF of the gaussian kernel density estimate of the sample
+       kernels are centered on centers quantiles of the sample rather than every value,
+       bw defaults to silverman's rule of thumb
+    """
+    bw = bw or bandwidth(sample)
+    centers = np.quantile(sample, (np.arange(min(centers, len(sample))) + 0.5) / min(centers, len(sample)))
+    x = np.linspace(centers[0] - 4 * bw, centers[-1] + 4 * bw, size)
+    cdf = np.zeros(size)
+    for start, stop in chunks(len(centers), 2 ** 7):
+        cdf += stats.norm.cdf((x[:, None] - centers[None, start:stop]) / bw).sum(axis=1)
+    cdf = (cdf - cdf[0]) / (cdf[-1] - cdf[0])
+    grid = np.linspace(0, 1, size)
+    return InverseCDF.from_values(grid, np.interp(grid, cdf, x))
+
+def table_generate(table, size: int, unique=False, rows=None, rng=np.random):
+    """return array drawn from a tabulated inverse cdf, same as stats_model_generate
+    """
+    start, stop = rows or (0, size)
     if unique:
-        p = np.linspace(p_low, p_high, size)
+        p = linspace(0, 1, size, start, stop)
     else:
-        p = np.random.rand(size) * (p_high - p_low) + p_low
-    return m.ppf(p)
+        p = rng.random(stop - start)
+    return table(p)
+
+@lru_cache(maxsize=256)
+def inverse_cdf_table(model, min: float, max: float, args: tuple = (), kwargs: tuple = (), accuracy: float = ACCURACY):
+    """return memoized table of the inverse cdf of the model truncated to [min, max], None if it has no finite table
+    """
+    m, p_low, p_high = truncated_model(min, max, *args, model=model, **dict(kwargs))
+    if is_discrete(model):
+        return tabulate_discrete(m, p_low, p_high)
+    table = tabulate(m, p_low, p_high, accuracy=accuracy)
+    if table is not None:
+        # ppf of the cdf of the bounds can round just outside them
+        np.clip(table.values, min, max, out=table.values)
+    return table
+
+def inverse_cdf(q: np.array, min: float, max: float, *args, model: str = 'uniform', accuracy: float = ACCURACY, **kwargs):
+    """return value at cumulative probability q in [0, 1] of the model truncated to [min, max]
+       continuous models interpolate a table of the inverse cdf and discrete models look up their support,
+       uniform or accuracy 0 use the exact ppf
+    """
+    table = None
+    if accuracy and model != 'uniform' and hashable(args, kwargs):
+        table = inverse_cdf_table(model, min, max, args, tuple(sorted(kwargs.items())), accuracy)
+    if table is not None:
+        return table(q)
+    m, p_low, p_high = truncated_model(min, max, *args, model=model, **kwargs)
+    return m.ppf(q * (p_high - p_low) + p_low)
+
+def stats_model_generate(size: int, min: float, max: float, *args, model: str = 'uniform', unique=False, rows=None,
+                         rng=np.random, accuracy: float = ACCURACY, **kwargs):
+    """return array based on the statistical distribution
+       parameters to the model can be passed in as ordered or key-word wildcards 
+       rows (start, stop) only returns that block of a size-row column
+       accuracy is the error of the tabulated inverse cdf as fraction of the value range, 0 for the exact ppf
+    """
+    start, stop = rows or (0, size)
+    if unique:
+        p = linspace(0, 1, size, start, stop)
+    else:
+        p = rng.random(stop - start)
+    return inverse_cdf(p, min, max, *args, model=model, accuracy=accuracy, **kwargs)
+
+def stats_model_quantile(p: np.array, min: float, max: float, *args, model: str = 'uniform', accuracy: float = ACCURACY,
+                         **kwargs):
+    """return value at cumulative probability p of the distribution truncated to [min, max]
+       monotone in p, so sorted p returns sorted values
+    """
+    return inverse_cdf(p, min, max, *args, model=model, accuracy=accuracy, **kwargs)
+
+def cholesky(matrix):
+    """return lower triangular cholesky factor of a correlation matrix
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    assert matrix.ndim == 2 and matrix.shape[0] == matrix.shape[1], f'correlation matrix should be square, got {matrix.shape}'
+    assert np.allclose(matrix, matrix.T) and np.allclose(np.diag(matrix), 1), 'correlation matrix should be symmetric with unit diagonal'
+    try:
+        return np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError:
+        raise AssertionError('correlation matrix should be positive definite')
+
+def correlated_uniform(factor: np.array, start: int, stop: int, size: int, seed, *keys, chunk_size: int = CHUNK_SIZE):
+    """return rows [start, stop) of one column of a gaussian copula as uniform in [0, 1]
+       factor is the row of the cholesky factor of the correlation matrix for the column, every column of the copula
+       draws the same standard normal block of rows by columns from the stream named by keys, so each column
+       is generated on its own in O(rows * columns) and the blocks bound memory
+    """
+    factor = np.asarray(factor, dtype=float)
+    arrs = [(rng(seed, *keys, block=block).standard_normal((b - a, len(factor))) @ factor)[max(start, a) - a:stop - a]
+            for block, a, b in blocks(start, stop, size, chunk_size)]
+    return stats.norm.cdf(np.concatenate(arrs)) if arrs else np.zeros(0)
 
 def stats_model_fit(arr: np.array, model: str = 'uniform'):
     """return model best fit parameters based on input array
@@ -9,6 +9,7 @@ import enum
 import json
 import asyncio
 import tempfile
+from itertools import repeat
 from typing import List, Dict, Tuple, Any
 from dataclasses import dataclass, field
 from contextlib import asynccontextmanager
@@ -16,7 +17,8 @@ import numpy as np
 from scipy import stats
 from genesynth.io import load_config, write_as_gzip
 from genesynth.types import *
-from genesynth.utils import iterate_lines
+from genesynth.store import LineWriter, encode
+from genesynth.mat import CHUNK_SIZE, chunks, cholesky
 
 extensions = Datatypes()  
 
@@ -44,15 +46,30 @@ class BaseDataModel(BaseMapFixture):
     label: dict = field(default_factory=dict)
     children: dict = field(default_factory=dict)
     workload = WorkloadType.DEFAULT
+    _scratch = None # directory the cache directory is created in, the system temporary directory if None
+    _tmp = None
 
     def __post_init__(self):
         super().__post_init__()
-        self._dir = tempfile.TemporaryDirectory()
         self.metadata = Hashabledict(self.metadata)
         self.constraints = tuple(self.constraints)
         self.label = Hashabledict(self.label)
         self.children = Hashabledict(self.children)
 
+    def memory(self):
+        """estimated bytes of the block of rows merged at a time, every value and line is a bytes object
+        """
+        start, stop = self.span
+        return min(stop - start, CHUNK_SIZE) * (self.width + 33 * (len(self.children) + 1))
+
+    @property
+    def _dir(self):
+        """cache directory of the data model, created on first use
+        """
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(dir=self._scratch)
+        return self._tmp
+
     async def __aiter__(self):
         pass
 
@@ -68,32 +85,63 @@ class BaseDataModel(BaseMapFixture):
         else:
             filename = os.path.join(path, self.name)
         with open(filename, 'wb+') as fh:
-            yield fh
+            start, stop = self.span
+            writer = LineWriter(fh, filename, stop - start)
+            yield writer
+            writer.close()
 
-    async def merge(self, nodes, path=None):
+    async def merge(self, nodes, path=None, chunk_size=CHUNK_SIZE):
         """Combine children cache files into one
+        rows are assembled a block at a time from the column text and written with a single write per block
         """
-        filenames = [node._file for node in nodes]
-        length = 0
-        async with self._filename(path) as fh:
-            for lines in iterate_lines(*filenames):
-                fh.write(self.sep.join(lines))
-                fh.write(b'\n')
+        columns = [await self.artifacts.column(node) for node in nodes]
+        length = min(len(column) for column in columns) if columns else 0
+        async with self._filename(path) as writer:
+            for start, stop in chunks(length, chunk_size):
+                lines = [column.lines(start, stop) for column in columns]
+                writer.write(list(map(self.sep.join, zip(*lines))))
                 await asyncio.sleep(0)
-                length += 1
-        assert length == self.size or length - 1 == self.size, f'expected {self.size} data row, got {length}'
+        start, stop = self.span
+        assert length == stop - start, f'expected {stop - start} data row, got {length}'
 
-    async def write(self):
-        if self._file is not None:
+    def correlate(self):
+        """assign the gaussian copula of metadata correlation to the columns it names
+        correlation: {columns: [...], matrix: [[...], ...]}, columns keep their own dist through their quantile.
+        the copula sets the order of the rows, unique and sorted constraints of correlated columns are ignored
+        """
+        correlation = self.metadata.get('correlation')
+        if not correlation:
             return
-        gens = []
+        columns = list(correlation['columns'])
+        factor = cholesky(correlation['matrix'])
+        assert len(columns) == len(factor), f'{self.name} correlation matrix should be {len(columns)} by {len(columns)}'
+        children = {n.name.rsplit('.', 1)[-1]: n for n in self.children.values()}
+        for i, column in enumerate(columns):
+            assert column in children, f'{self.name} has no column {column} to correlate'
+            node = children[column]
+            assert node.correlatable, f'{node.name} of type {type(node).__name__} can not be correlated'
+            node._copula = (self.name, tuple(factor[i].tolist()))
+
+    def stage(self):
+        """assign the cache directory, artifact store and copula of the children, return the directory
+        """
+        self.correlate()
         for n in self.children.values():
-            gens.append(n)
             n._path = self._dir.name
-            # TODO defer this to orchestrator
-            await n.write()
-        await self.merge(gens, path=self._dir.name)
-        self._file = os.path.join(self._dir.name, self.name)
+            n._artifacts = self.artifacts
+        return self._dir.name
+
+    @property
+    def filename(self):
+        return os.path.join(self.stage(), self.name)
+
+    async def write(self):
+        if self._file is not None:
+            return
+        path = self.stage()
+        gens = list(self.children.values())
+        await self.merge(gens, path=path)
+        self._file = os.path.join(path, self.name)
 
     async def save(self, filename=None):
         if self._file is None:
@@ -122,6 +170,10 @@ class TableDataModel(BaseDataModel):
         if isinstance(self.sep, str):
             self.sep = self.sep.encode('utf-8')
 
+    @property
+    def width(self):
+        return sum(node.width for node in self.children.values()) + len(self.sep) * max(len(self.children) - 1, 0)
+
     @property
     def has_header(self):
         return self.metadata.get('header')
@@ -148,12 +200,16 @@ class TableDataModel(BaseDataModel):
             filename = os.path.join(self._dir.name, self.name)
         else:
             filename = os.path.join(path, self.name)
+        start, stop = self.span
         with open(filename, 'wb+') as fh:
-            if self.has_header:
+            # a shard only carries the header or footer if it holds the first or last row
+            if self.has_header and start == 0:
                 fh.write(self.header)
                 fh.write(b'\n')
-            yield fh
-            if self.has_footer:
+            writer = LineWriter(fh, filename, stop - start)
+            yield writer
+            writer.close()
+            if self.has_footer and stop == self.size:
                 fh.write(self.footer)
 
     def __hash__(self):
@@ -164,23 +220,50 @@ class TableDataModel(BaseDataModel):
 @dataclass(unsafe_hash=True)
 class JsonDataModel(BaseDataModel):
     is_data = True
-    async def merge(self, nodes, path=None):
-        filenames = {node.name: node._file for node in nodes}
-        async with self._filename(path) as fh:
-            for lines in iterate_lines(*filenames.values()):
-                # TODO add support for array
-                record = {key if self.full_key else key.split('.')[-1] : \
-                            json.loads(value) if isinstance(node, BaseMapFixture) else value 
-                            for node, key, value in zip(nodes, filenames.keys(), lines)}
-                fh.write(json.dumps(record, default=lambda x: x.decode()).encode('utf-8'))
-                fh.write(b'\n')
+    opening = b'{'
+    closing = b'}'
+
+    def tolist(self, arr):
+        return [None if masked else json.loads(value) for value, masked in zip(arr.tolist(), np.ma.getmaskarray(arr))]
+
+    def jsonify(self, arr):
+        """rows are already json text
+        """
+        return np.where(np.ma.getmaskarray(arr), 'null', np.ma.getdata(arr))
+
+    def keys(self, nodes):
+        """return json text preceding each column value in a row, computed once per merge
+        """
+        keys = [node.name if self.full_key else node.name.split('.')[-1] for node in nodes]
+        return [(self.opening if i == 0 else b', ') + json.encoder.encode_basestring_ascii(key).encode('utf-8') + b': '
+                for i, key in enumerate(keys)]
+
+    def lines(self, nodes, columns, keys, start, stop):
+        """return rows [start, stop) as json lines spliced from the json text of each column block
+        """
+        size = stop - start
+        if not nodes:
+            return [self.opening + self.closing] * size
+        parts = []
+        for node, column, key in zip(nodes, columns, keys):
+            parts.append(repeat(key, size))
+            parts.append(encode(node.jsonify(column[start:stop])))
+        parts.append(repeat(self.closing, size))
+        return list(map(b''.join, zip(*parts)))
+
+    async def merge(self, nodes, path=None, chunk_size=CHUNK_SIZE):
+        columns = [await self.artifacts.column(node) for node in nodes]
+        keys = self.keys(nodes)
+        size = self.span[1] - self.span[0]
+        async with self._filename(path) as writer:
+            for start, stop in chunks(size, chunk_size):
+                writer.write(self.lines(nodes, columns, keys, start, stop))
                 await asyncio.sleep(0)
-            fh.seek(0)
-            length = len(list(fh))
-        assert length == self.size, f'expected {self.name} to have {self.size} data row, got {length}'
+            length = writer.row
+        assert length == size, f'expected {self.name} to have {size} data row, got {length}'
 
-    async def write(self):
-        gens = []
+    def stage(self):
+        self.correlate()
         if self._path is None:
             path = self._dir.name
         else:
@@ -188,10 +271,13 @@ class JsonDataModel(BaseDataModel):
         if not os.path.isdir(path):
             os.mkdir(path)
         for n in self.children.values():
-            gens.append(n)
             n._path = path
-            # TODO defer this to orchestrator
-            await n.write()
+            n._artifacts = self.artifacts
+        return path
+
+    async def write(self):
+        path = self.stage()
+        gens = list(self.children.values())
         await self.merge(gens, path)
         self._file = os.path.join(path, self.name)
 
@@ -199,16 +285,5 @@ class JsonDataModel(BaseDataModel):
 @dataclass(unsafe_hash=True)
 class JsonArrayDataModel(JsonDataModel):
     is_data = True
-    async def merge(self, nodes, path=None):
-        filenames = {node.name: node._file for node in nodes}
-        async with self._filename(path) as fh:
-            for lines in iterate_lines(*filenames.values()):
-                # TODO add support for array
-                record = {key if self.full_key else key.split('.')[-1] : json.loads(value) if isinstance(node, BaseMapFixture) else value 
-                            for node, key, value in zip(nodes, filenames.keys(), lines)}
-                fh.write(json.dumps([record], default=lambda x: x.decode('ascii')).encode('utf-8'))
-                fh.write(b'\n')
-                await asyncio.sleep(0)
-            fh.seek(0)
-            length = len(list(fh))
-        assert length == self.size, f'expected {self.size} data row, got {length}'
+    opening = b'[{'
+    closing = b'}]'
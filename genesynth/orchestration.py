@@ -4,7 +4,12 @@ This module should ONLY dictate the dependency tree based on processing optimiza
 Orchestration can use higher level datatypes from Model to do garbage collection to optimize for cache datasize.
 """
 
+import os
 import sys
+import json
+import time
+import random
+import functools
 import logging
 import typing
 import enum
@@ -14,12 +19,16 @@ import networkx as nx
 from dataclasses import dataclass
 from multiprocessing import Manager, cpu_count
 from concurrent import futures
-from genesynth.types import Hashabledict, BaseForeign
+from genesynth.types import Hashabledict, BaseMask, BaseForeign, reseed
 from genesynth.graph import Graph, find_node, find_child_node
 from genesynth.model import worker, types, BaseDataModel, WorkloadType
 from genesynth.extensions import datatypes
-from genesynth.worker import Runner
-from genesynth.io import load_configs, schema_to_graph
+from genesynth.worker import Runner, pools
+from genesynth import store
+from genesynth.store import Artifacts
+from genesynth.instrument import Instrument
+from genesynth.profiler import Profiler, profiled
+from genesynth.io import load_configs, schema_to_graph, concat_files, CacheCollection
 from genesynth.utils import spawn, wait
 from genesynth.constraints import *
 
@@ -32,15 +41,41 @@ class Orchestration:
     """
     Handles processing optimization by determing the type of worker that can be used for each data type.
     """
-    def __init__(self, graph, thread=10, runner=Runner(registry=worker)):
+    def __init__(self, graph, thread=None, runner=None, limits=None, plan=None, cache=None, gc=True, scratch=None, max_disk=None,
+                 max_memory=None, instrument=None, profiler=None):
         self.graph = graph
-        self.runner = runner
-        self.max_workers = runner.max_workers * thread
-        self.queue = asyncio.Queue(self.max_workers)
-        self.executor = futures.ThreadPoolExecutor(thread)
+        self.runner = runner or Runner(registry=worker)
+        # thread sizes the thread pool of the runner, which is shared by every Orchestration unless the runner has its own
+        if thread is not None:
+            self.runner.pools.configure(threads=thread)
+        thread = self.runner.pools.threads
+        self.max_workers = self.runner.max_workers * thread
+        # number of nodes of each workload type processed concurrently
+        self.limits = {WorkloadType.DEFAULT: self.max_workers, WorkloadType.IO: thread, WorkloadType.CPU: self.runner.max_workers}
+        self.limits.update(limits or {})
+        self.artifacts = Artifacts()
+        # file the compiled plan is kept in between runs of the same schema
+        self.plan_file = plan
+        self.plan = None
+        # CacheCollection serving unchanged nodes from earlier runs
+        self.cache = cache
+        self.skip = set()
+        self.hits = set()
+        # delete intermediate files once read by every consumer, keep the files under scratch within max_disk bytes
+        self.gc = gc
+        self.scratch = scratch
+        self.max_disk = max_disk
+        self.disk = {}
+        # estimated bytes the nodes running at once may hold in memory
+        self.max_memory = max_memory
+        self.instrument = instrument or Instrument()
+        # Profiler wrapping the execution of every node
+        self.profiler = profiler
+        self.timings = {}
+        self.wall_time = None
 
     @classmethod
-    def read_dict(cls, data, size=None, name='root'):
+    def read_dict(cls, data, size=None, name='root', **kwargs):
         size = size or data['metadata']['size']
         G = nx.DiGraph()
         schema_to_graph(G, name, data, size=int(size), root=name)
@@ -48,53 +83,227 @@ class Orchestration:
         #for n in graph.nodes:
         #    if isinstance(n, BaseForeign):
         #        n.resolve_fkey_edge()
-        return cls(graph)
+        return cls(graph, **kwargs)
 
     @classmethod
-    def read_config(cls, *filenames, name='root'):
+    def read_config(cls, *filenames, name='root', **kwargs):
         data = load_configs(*filenames)
         size = data['metadata']['size']
-        return cls.read_dict(data, size=size)
+        return cls.read_dict(data, size=size, **kwargs)
 
-    async def walk(self):
-        # TODO check to make sure this is correct
-        for parent, node in self.graph.traversal():
-            logger.debug(node)
-            await self.queue.put(node)
+    @property
+    def executor(self):
+        return self.runner.pools.thread
 
     @property
     def root(self):
         return next(iter(self.graph.root))
 
-    async def __aiter__(self):
+    def shard(self, index, shards):
+        """restrict every node to one of shards ranges of its row space, [size * index // shards, size * (index + 1) // shards)
+        """
+        for node in self.graph.nodes:
+            node._span = (node.size * index // shards, node.size * (index + 1) // shards)
+
+    def resolve(self):
+        """add the fkey edge of every foreign node to the graph
+        """
+        for node in list(self.graph.nodes):
+            if isinstance(node, BaseForeign):
+                node.resolve_fkey_edge()
+
+    def stage(self):
+        """return nodes written by the orchestrator, parents first, after assigning their cache directory and artifact store
+        children of a non data model node are generated by their parent
+        """
+        for node in self.graph.nodes:
+            node._artifacts = self.artifacts
+            if self.scratch is not None:
+                node._scratch = self.scratch
+        nodes = []
+        stack = list(self.graph.root)
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if isinstance(node, BaseDataModel):
+                node.stage()
+                stack.extend(reversed(list(node.children.values())))
+        return nodes
+
+    def workload(self, node):
+        if isinstance(node, BaseDataModel):
+            return WorkloadType.DEFAULT
+        return node.workload
+
+    def cached(self):
+        """return nodes that need not be written as every node reading them is served from the cache
+        """
+        nodes = self.graph.index
+        hits = {name for name in self.plan.order if nodes[name].cache_key() in self.cache}
+        needed = set()
+        for name in reversed(self.plan.order):
+            consumers = self.plan.consumers[name]
+            if not consumers or any(c in needed and c not in hits for c in consumers):
+                needed.add(name)
+        return {nodes[name] for name in self.plan.order if name not in needed}
+
+    async def execute(self, node, semaphores):
+        """write node to its cache file using the worker of its workload type
+        """
+        if node in self.skip:
+            return
+        workload = self.workload(node)
+        async with semaphores[workload]:
+            start = time.perf_counter()
+            key = node.cache_key() if self.cache is not None else None
+            if key is not None and self.cache.get(key, node.filename):
+                node._file = node.filename
+                self.hits.add(node)
+            elif workload == WorkloadType.IO:
+                await self.thread(node, method='write')
+            elif workload == WorkloadType.CPU:
+                arr = await self.process(node)
+                with self.instrument.measure(node, 'write', 'asyncio'), profiled(self.profiler, node, 'write'):
+                    await node.write(arr)
+            else:
+                with self.instrument.measure(node, 'merge', 'asyncio'), profiled(self.profiler, node, 'merge'):
+                    await node.write()
+            await self.artifacts.column(node)
+            self.disk[node] = store.nbytes(node._file)
+            if key is not None:
+                self.cache.put(key, node._file)
+            self.timings[node] = (start, time.perf_counter())
+            logger.debug(node)
+
+    def load(self, nodes):
+        """return estimated bytes on disk and in memory of writing nodes
+        """
+        nodes = [node for node in nodes if node not in self.skip]
+        return sum(node.nbytes() for node in nodes), sum(node.memory() for node in nodes)
+
+    def admit(self, node, running):
+        """return True if node fits in the disk and memory budget along with the running nodes
+        """
+        disk, memory = self.load([node, *running])
+        return ((self.max_disk is None or sum(self.disk.values()) + disk <= self.max_disk)
+                and (self.max_memory is None or memory <= self.max_memory))
+
+    def free(self, node):
+        """delete the cache file of a node every consumer has read
+        """
+        self.artifacts.pop(node, None)
+        self.disk.pop(node, None)
+        if node._file is not None:
+            store.remove(node._file)
+            node._file = None
+
+    async def schedule(self):
+        """
+        write every node once all nodes it depends on are written,
+        running as many as the workload limits allow at the same time.
+        a node waits while its estimated file or working set does not fit in the budget, unless nothing else is running.
+        """
+        self.resolve()
+        self.plan = self.graph.compile(self.stage(), filename=self.plan_file)
+        nodes = self.graph.index
+        self.skip = self.cached() if self.cache is not None else set()
+        semaphores = {workload: asyncio.Semaphore(limit) for workload, limit in self.limits.items()}
+        waiting = {nodes[name]: len(names) for name, names in self.plan.dependencies.items()}
+        ready = [node for node, degree in waiting.items() if degree == 0]
+        remaining = {nodes[name]: len(names) for name, names in self.plan.consumers.items()}
+        running = {}
+        start = time.perf_counter()
+        try:
+            while ready or running:
+                deferred = []
+                for node in ready:
+                    if not self.admit(node, running.values()):
+                        if running:
+                            deferred.append(node)
+                            continue
+                        logger.warning(f'{node.name} exceeds the budget of {self.max_disk} bytes on disk, {self.max_memory} in memory')
+                    running[asyncio.create_task(self.execute(node, semaphores))] = node
+                ready = deferred
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = running.pop(task)
+                    task.result()
+                    if self.max_memory is not None:
+                        node.spill()
+                    for name in self.plan.dependencies[node.name]:
+                        remaining[nodes[name]] -= 1
+                        if self.gc and remaining[nodes[name]] == 0:
+                            self.free(nodes[name])
+                    for name in self.plan.consumers[node.name]:
+                        successor = nodes[name]
+                        waiting[successor] -= 1
+                        if waiting[successor] == 0:
+                            ready.append(successor)
+        finally:
+            for task in running:
+                task.cancel()
+        self.wall_time = time.perf_counter() - start
+        path, duration = self.critical_path()
+        logger.info(f'{len(self.timings)} nodes in {self.wall_time:.3f}s, critical path {duration:.3f}s: '
+                    + ' -> '.join(n.name for n in path))
+
+    @property
+    def dag(self):
+        """return graph of the plan with an edge from each node to the nodes waiting on it
         """
-        graph.iter: degree_search -> iterate node -> dependency_graph -> generate
-        orchestraion.iter: type check -> aggregate by nearest map/array -> garbage collect
+        nodes = self.graph.index
+        D = nx.DiGraph()
+        D.add_nodes_from(nodes[name] for name in self.plan.order)
+        D.add_edges_from((nodes[name], nodes[consumer]) for name, names in self.plan.consumers.items() for consumer in names)
+        return D
+
+    def manifest(self):
+        """return the seed and the cache key of every node in the plan, compared against by the next run
         """
-        #for node in self.graph.G:
-        #    arr = await self.generate(node)
-        #    await node.write(arr)
-
-        # TODO Add reduce step from DataModel and garbage collect
-        await self.walk()
-        while self.queue.qsize() > 0:
-            node = await self.queue.get()
-            arr = await self.generate(node)
-            logger.debug(arr)
-            try:
-                await node.write()
-            except TypeError:
-                await node.write(arr)
+        nodes = self.graph.index
+        return {'seed': BaseMask.seed, 'nodes': {name: nodes[name].cache_key() for name in self.plan.order}}
+
+    def diff(self, manifest):
+        """return names of nodes whose key is not in manifest along with every node depending on them,
+        containers of a changed node and foreign keys referring to it
+        """
+        nodes = self.graph.index
+        previous = manifest.get('nodes', {})
+        changed = {name for name in self.plan.order if previous.get(name) != nodes[name].cache_key()}
+        stack = list(changed)
+        while stack:
+            for name in self.plan.consumers[stack.pop()]:
+                if name not in changed:
+                    changed.add(name)
+                    stack.append(name)
+        return changed
+
+    def critical_path(self):
+        """return the chain of dependent nodes with the longest total processing time and the time
+        """
+        nodes = self.graph.index
+        finish = {}
+        previous = {}
+        for node in map(nodes.get, self.plan.order):
+            start, stop = self.timings.get(node, (0, 0))
+            previous[node] = max(map(nodes.get, self.plan.dependencies[node.name]), key=finish.get, default=None)
+            finish[node] = stop - start + finish.get(previous[node], 0)
+        node = max(finish, key=finish.get, default=None)
+        path = []
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return path[::-1], finish[path[0]] if path else 0
 
     def run(self):
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError:
-            loop = asyncio.get_event_loop()
+            loop = None
         if loop and loop.is_running():
-            loop.create_task(self.__aiter__())
+            loop.create_task(self.schedule())
         else:
-            asyncio.run(self.__aiter__())
+            asyncio.run(self.schedule())
 
     async def generate(self, node):
         # TODO replace this with graph traversal and task queue/dequeue
@@ -108,17 +317,28 @@ class Orchestration:
             return await self.asyncio(node)
 
     async def process(self, node):
-        return await self.runner.run(node.generate)
+        profile = self.profiler.profile(node, 'generate') if self.profiler is not None else None
+        with self.instrument.measure(node, 'generate', 'process'):
+            return await self.runner.run(node.generate, profile=profile)
 
-    async def thread(self, node):
+    async def thread(self, node, method='generate'):
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError:
             loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, spawn, node.generate)
+        run = spawn if self.profiler is None else functools.partial(self.profiler.profile(node, method), spawn)
+        return await loop.run_in_executor(self.executor, self.instrument.call, node, method, 'thread', run, getattr(node, method))
 
     async def asyncio(self, node):
-        return await node.generate()
+        with self.instrument.measure(node, 'generate', 'asyncio'), profiled(self.profiler, node, 'generate'):
+            return await node.generate()
+
+    def report(self):
+        """return the run report, wall time, critical path, cache hits and the instrument records
+        """
+        path, duration = self.critical_path()
+        return {'wall_time': self.wall_time, 'critical_path': [node.name for node in path], 'critical_time': duration,
+                'hits': sorted(node.name for node in self.hits), 'records': self.instrument.report()}
 
     def __del__(self, *args):
         del self.graph
@@ -128,3 +348,67 @@ def run(config: dict):
     pipe.run()
     asyncio.run(pipe.root.save())
     return pipe.root
+
+def run_incremental(config: dict, directory: str, seed=None, **kwargs):
+    """generate config reusing the columns of the previous run kept in directory
+    only nodes that changed since, and the nodes depending on them, are generated again and only their tables merged.
+    the seed of the previous run is kept unless seed is given
+    """
+    filename = os.path.join(directory, 'manifest.json')
+    manifest = {}
+    if os.path.isfile(filename):
+        with open(filename) as fh:
+            manifest = json.load(fh)
+    if seed is None:
+        seed = manifest.get('seed')
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    reseed(seed)
+    cache = CacheCollection('genesynth', directory=os.path.join(directory, 'columns'))
+    pipe = Orchestration.read_dict(config, cache=cache, plan=os.path.join(directory, 'plan.json'), **kwargs)
+    pipe.resolve()
+    pipe.plan = pipe.graph.compile(pipe.stage(), filename=pipe.plan_file)
+    changed = pipe.diff(manifest)
+    logger.info(f'{len(changed)} of {len(pipe.plan.order)} nodes changed since the previous run')
+    pipe.run()
+    manifest = pipe.manifest()
+    cache.prune(manifest['nodes'].values())
+    with open(filename, 'w') as fh:
+        json.dump(manifest, fh)
+    return pipe
+
+def part_filename(filename: str, index: int):
+    """return filename.part-xxxxx, or stem.part-xxxxx.gz for gzip output so the part is compressed as well
+    """
+    stem, ext = os.path.splitext(filename)
+    if ext == '.gz':
+        return f'{stem}.part-{index:05d}{ext}'
+    return f'{filename}.part-{index:05d}'
+
+def run_shard(config: dict, filename: str, index: int, shards: int, seed=None, cache=None, **kwargs):
+    """generate one shard of the rows of every table into its part file, return the part filename
+    called in a worker process, every shard draws the same rows as a single run would.
+    kwargs are passed on to the Orchestration of the shard
+    """
+    if seed is not None:
+        reseed(seed)
+    pipe = Orchestration.read_dict(config, cache=cache, **kwargs)
+    pipe.shard(index, shards)
+    pipe.run()
+    part = part_filename(filename, index)
+    asyncio.run(pipe.root.save(part))
+    return part
+
+def run_shards(config: dict, filename: str, shards: int, jobs=None, seed=None, concat=False, cache=None, **kwargs):
+    """generate shards of the rows in up to jobs worker processes, return part filenames
+    or filename if the parts are concatenated. kwargs are passed on to the Orchestration of every shard
+    """
+    if seed is None:
+        # shards draw their part of the same rows, which workers started by spawn do not share otherwise
+        seed = random.SystemRandom().randrange(2 ** 32)
+    shard = functools.partial(run_shard, **kwargs)
+    with futures.ProcessPoolExecutor(jobs or min(shards, cpu_count())) as executor:
+        parts = list(executor.map(shard, *zip(*((config, filename, i, shards, seed, cache) for i in range(shards)))))
+    if concat:
+        return concat_files(parts, filename, remove=True)
+    return parts
@@ -0,0 +1,139 @@
+"""
+Planner estimates the cost of generating a schema without generating it.
+Rows, bytes in memory and bytes on disk come from the size estimates of each node,
+time from the seconds per row of every fixture type, calibrated once per type on a small sample of rows.
+Types calling a service are not run, their time comes from an assumed rate per row instead.
+"""
+
+import sys
+import asyncio
+from dataclasses import dataclass
+from genesynth.orchestration import Orchestration, BaseDataModel, WorkloadType
+from genesynth.types import BaseForeign, SerialFixture
+from genesynth.io import resize
+
+@dataclass
+class Estimate:
+    name: str
+    type: str
+    rows: int
+    memory: int # bytes held in memory while written
+    disk: int # bytes of the cache file
+    seconds: float
+    assumed: bool = False # seconds come from an assumed rate instead of a calibrated one
+
+def fixture_type(node):
+    """return the key nodes share a calibrated rate by, their type and provider
+    """
+    return type(node).__name__, getattr(node, 'subtype', None), getattr(node, 'field', None)
+
+def assumed_rate(node):
+    """return seconds per row of a node that is not timed, from its rate metadata or its type, None if it is timed
+    """
+    return getattr(node, 'metadata', node._metadata).get('rate', node.rate)
+
+def under(node):
+    """yield the nodes contained in node, without following foreign keys
+    """
+    children = getattr(node, 'children', None) or ()
+    for child in (children.values() if isinstance(children, dict) else children):
+        yield child
+        yield from under(child)
+
+async def merge_rate(node, sample: int, columns: int = 4):
+    """return seconds per row and column of merging a data model of the type of node
+    """
+    children = {f'column{i}': SerialFixture(name=f'{node.name}.column{i}', size=sample) for i in range(columns)}
+    metadata = {key: value for key, value in node.metadata.items() if key != 'correlation'}
+    model = type(node)(name=node.name, size=sample, children=children, metadata=metadata)
+    model.stage()
+    for child in children.values():
+        await child.write()
+    start = asyncio.get_running_loop().time()
+    await model.write()
+    return (asyncio.get_running_loop().time() - start) / (sample * columns)
+
+async def calibrate_nodes(pipe, nodes, sample):
+    semaphores = {workload: asyncio.Semaphore(1) for workload in WorkloadType}
+    rates = {}
+    for node in nodes:
+        key = fixture_type(node)
+        if key in rates:
+            continue
+        if isinstance(node, BaseDataModel):
+            rates[key] = await merge_rate(node, sample)
+            continue
+        # types calling a service, and nodes generating or copying them, are never run while planning
+        if any(assumed_rate(n) is not None for n in (node, *under(node))):
+            continue
+        if isinstance(node, BaseForeign) and assumed_rate(node.node) is not None:
+            continue
+        if isinstance(node, BaseForeign) and node.node._file is None:
+            await pipe.execute(node.node, semaphores)
+        await pipe.execute(node, semaphores)
+        start, stop = pipe.timings[node]
+        rates[key] = (stop - start) / max(node.size, 1)
+    return rates
+
+def calibrate(config: dict, sample: int = 1000):
+    """return seconds per row of every fixture type, and per row and column of every data model type,
+    measured by generating one node of each type with at most sample rows, types with an assumed rate are not generated
+    """
+    pipe = Orchestration.read_dict(resize(config, sample, cap=True))
+    pipe.resolve()
+    plan = pipe.graph.compile(pipe.stage())
+    nodes = pipe.graph.index
+    return asyncio.run(calibrate_nodes(pipe, [nodes[name] for name in plan.order], sample))
+
+def estimate(config: dict, sample: int = 1000):
+    """return (estimate of every node in processing order, estimate of every data model including the nodes under it)
+    """
+    rates = calibrate(config, sample)
+    def seconds(node):
+        if assumed_rate(node) is not None:
+            return assumed_rate(node) * node.size
+        if isinstance(node, BaseDataModel):
+            return rates.get(fixture_type(node), 0) * node.size * len(node.children)
+        return rates.get(fixture_type(node), 0) * node.size
+
+    pipe = Orchestration.read_dict(config)
+    pipe.resolve()
+    plan = pipe.graph.compile(pipe.stage())
+    nodes = pipe.graph.index
+    estimates = {}
+    for name in plan.order:
+        node = nodes[name]
+        estimates[name] = Estimate(name=name, type=type(node).__name__, rows=node.size, memory=node.memory(),
+                                   disk=node.nbytes(), seconds=seconds(node), assumed=assumed_rate(node) is not None)
+    tables = []
+    for name in plan.order:
+        node = nodes[name]
+        if not isinstance(node, BaseDataModel):
+            continue
+        nodes_under = [estimates[n.name] for n in under(node) if n.name in estimates] + [estimates[name]]
+        # files of the nodes under a table are on disk together until it is merged, at most one of them is written at a time
+        tables.append(Estimate(name=name, type=type(node).__name__, rows=node.size, memory=max(e.memory for e in nodes_under),
+                               disk=sum(e.disk for e in nodes_under), seconds=sum(e.seconds for e in nodes_under),
+                               assumed=any(e.assumed for e in nodes_under)))
+    return list(estimates.values()), tables
+
+def humanize(nbytes):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(nbytes) < 1024 or unit == 'TB':
+            return f'{nbytes:.0f}{unit}' if unit == 'B' else f'{nbytes:.1f}{unit}'
+        nbytes /= 1024
+
+def report(estimates, tables, fh=sys.stdout):
+    """print estimates of the nodes followed by the tables as aligned text, seconds from an assumed rate marked by *
+    """
+    width = max((len(e.name) for e in estimates + tables), default=4)
+    header = f'{"name":<{width}}  {"type":<20} {"rows":>12} {"memory":>10} {"disk":>10} {"seconds":>10}\n'
+    for title, rows in (('nodes', estimates), ('tables', tables)):
+        fh.write(f'{title}\n')
+        fh.write(header)
+        for e in rows:
+            fh.write(f'{e.name:<{width}}  {e.type:<20} {e.rows:>12} {humanize(e.memory):>10} {humanize(e.disk):>10} '
+                     f'{e.seconds:>10.3f}{"*" if e.assumed else ""}\n')
+        fh.write('\n')
+    if any(e.assumed for e in estimates):
+        fh.write('* assumed seconds per row of a type calling a service, set by its rate metadata\n')
@@ -0,0 +1,138 @@
+"""
+Profiler wraps the execution of every node with cProfile or tracemalloc, in the thread or worker process running it,
+and merges the per node profiles into one report so hot spots can be attributed to schema nodes.
+tracemalloc traces the whole process, allocations of nodes running at the same time are attributed to each of them.
+"""
+
+import os
+import io
+import json
+import pstats
+import cProfile
+import tempfile
+import threading
+import tracemalloc
+from contextlib import nullcontext
+
+KINDS = ('cprofile', 'tracemalloc')
+
+# a thread runs one cProfile at a time, stages overlapping on the event loop are attributed to the first
+local = threading.local()
+
+class Profiled:
+    """
+    Picklable profile of one stage of a node, dumped to filename.
+    Used as a context manager in the running thread or called with the function to run in a worker.
+    """
+    def __init__(self, kind, filename, limit=50):
+        self.kind = kind
+        self.filename = filename
+        self.limit = limit
+        self.profile = None
+
+    def __enter__(self):
+        if self.kind == 'cprofile':
+            if getattr(local, 'active', False):
+                return self
+            local.active = True
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.profile = tracemalloc.take_snapshot()
+        return self
+
+    def __exit__(self, *args):
+        if self.profile is None:
+            return
+        if self.kind == 'cprofile':
+            self.profile.disable()
+            local.active = False
+            self.profile.dump_stats(self.filename)
+        else:
+            stats = tracemalloc.take_snapshot().compare_to(self.profile, 'lineno')
+            with open(self.filename, 'w') as fh:
+                json.dump([{'line': str(stat.traceback), 'size': stat.size_diff, 'count': stat.count_diff}
+                           for stat in stats[:self.limit] if stat.size_diff > 0], fh)
+        self.profile = None
+
+    def __call__(self, fn, *args, **kwargs):
+        with self:
+            return fn(*args, **kwargs)
+
+    def __getstate__(self):
+        return dict(self.__dict__, profile=None)
+
+class Profiler:
+    """
+    Hands out a Profiled per node stage writing into directory, a temporary directory if none is given.
+    """
+    def __init__(self, kind='cprofile', directory=None, limit=50):
+        assert kind in KINDS, f'profile should be one of {KINDS}, got {kind}'
+        self.kind = kind
+        self.limit = limit
+        if directory is None:
+            self.dir = tempfile.TemporaryDirectory(prefix='genesynth_profile_')
+            directory = self.dir.name
+        self.directory = directory
+        self.profiles = []
+
+    def profile(self, node, stage):
+        filename = os.path.join(self.directory, f'{len(self.profiles):05d}.{self.kind}')
+        self.profiles.append((node.name, stage, filename))
+        return Profiled(self.kind, filename, limit=self.limit)
+
+    def stats(self):
+        """yield (node name, stage, profile) of every profile dumped
+        """
+        for name, stage, filename in self.profiles:
+            if not os.path.isfile(filename):
+                continue
+            if self.kind == 'cprofile':
+                yield name, stage, pstats.Stats(filename)
+            else:
+                with open(filename) as fh:
+                    yield name, stage, json.load(fh)
+
+    def save(self, filename):
+        """write the profile of the whole run followed by the profile of every node stage as text to filename,
+        cprofile stats of the run are also dumped to filename.prof
+        """
+        if self.kind == 'tracemalloc' and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        profiles = list(self.stats())
+        with open(filename, 'w') as fh:
+            if self.kind == 'cprofile':
+                if profiles:
+                    total = pstats.Stats(*(name for _, _, name in self.profiles if os.path.isfile(name)))
+                    total.dump_stats(f'{filename}.prof')
+                    self.write_stats(fh, 'run', total)
+                for name, stage, stats in profiles:
+                    self.write_stats(fh, f'{name} {stage}', stats)
+            else:
+                total = {}
+                for _, _, stats in profiles:
+                    for stat in stats:
+                        total[stat['line']] = total.get(stat['line'], 0) + stat['size']
+                fh.write('run\n')
+                for line, size in sorted(total.items(), key=lambda item: -item[1])[:self.limit]:
+                    fh.write(f'{size:>12} B  {line}\n')
+                for name, stage, stats in profiles:
+                    fh.write(f'\n{name} {stage}\n')
+                    for stat in stats:
+                        fh.write(f'{stat["size"]:>12} B  {stat["count"]:>8}  {stat["line"]}\n')
+        return filename
+
+    def write_stats(self, fh, title, stats):
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats('cumulative').print_stats(self.limit)
+        fh.write(f'{title}\n{text.getvalue()}\n')
+
+def profiled(profiler, node, stage):
+    """return context profiling a stage of node in the running thread, a no-op without profiler
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.profile(node, stage)
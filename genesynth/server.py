@@ -4,19 +4,34 @@ import os
 import json
 import logging
 import argparse
+import tempfile
+from typing import Literal
+from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from pydantic import BaseModel
 from genesynth.orchestration import *
-from genesynth.utils import clean_text
+from genesynth.utils import stringify
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--host', default='localhost', help='server host')
 parser.add_argument('-p', '--port', default=8080, type=int, help='server port')
 parser.add_argument('-l', '--level', default='INFO', help='log level')
+parser.add_argument('--processes', type=int, help='number of worker process. defaults to cpu count')
+parser.add_argument('--threads', type=int, help='number of worker thread. defaults to 10')
+parser.add_argument('--profile-dir', default=tempfile.gettempdir(), help='directory profile reports of requests are saved to')
 
 logger = logging.getLogger(__name__)
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # workers are shared by every request, start them before the first one
+    pools.warm()
+    yield
+    pools.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+app.state.profile_dir = tempfile.gettempdir()
 
 class Schema(BaseModel):
     type: str = 'json'
@@ -29,22 +44,22 @@ async def home():
     return {'status': 'OK'}
 
 @app.post('/api')
-async def api(schema: Schema, size=None, string=False):
-    pipe = Orchestration.read_dict(dict(schema), size=size)
-    pipe.run()
+async def api(schema: Schema, response: Response, size=None, string=False, profile: Literal['cprofile', 'tracemalloc'] = None):
+    profiler = Profiler(profile) if profile else None
+    pipe = Orchestration.read_dict(dict(schema), size=size, profiler=profiler)
+    await pipe.schedule()
     await pipe.root.save() 
+    if profiler is not None:
+        # report is saved next to the server, the response only carries its path
+        fd, filename = tempfile.mkstemp(prefix='genesynth_', suffix='.profile', dir=app.state.profile_dir)
+        os.close(fd)
+        response.headers['X-Profile'] = profiler.save(filename)
     with open(pipe.root._file) as fh:
         try:
-            if string:
-                data = [json.loads(line) for line in fh if line.strip()]
-            else:
-                data = [json.loads(clean_text(line)) for line in fh if line.strip()]
+            data = [json.loads(stringify(line) if string else line) for line in fh if line.strip()]
         except:
             fh.seek(0)
-            if string:
-                data = [line for line in fh if line.strip()]
-            else:
-                data = [clean_text(line) for line in fh if line.strip()]
+            data = [line for line in fh if line.strip()]
         del pipe
         return data
 
@@ -55,4 +70,6 @@ def run_server(host='localhost', port=8080, level='INFO'):
 
 if __name__ == '__main__':
     args = parser.parse_args()
+    pools.configure(processes=args.processes, threads=args.threads)
+    app.state.profile_dir = args.profile_dir
     run_server(host=args.host, port=args.port, level=args.level)
@@ -0,0 +1,243 @@
+"""
+Store is the utility library that handles the binary column cache between generation and output.
+Fixed width dtypes are kept as .npy files and variable length strings as newline terminated utf-8 rows
+with an offset index, so both can be memory mapped and read back by row range without parsing.
+Only the final output step formats values as text.
+"""
+
+import os
+import numpy as np
+from numpy.lib.format import open_memmap
+from genesynth.mat import CHUNK_SIZE, chunks
+
+OFFSETS = '.offsets'
+MASK = '.mask'
+
+def is_fixed(dtype):
+    """return True if dtype is stored as a fixed width .npy column
+    """
+    return np.dtype(dtype).kind in 'biufcmM'
+
+def encode(arr):
+    """return list of utf-8 encoded rows
+    """
+    if arr.dtype.kind == 'S':
+        return arr.tolist()
+    if arr.dtype.kind == 'U':
+        return np.char.encode(arr, 'utf-8').tolist()
+    return [str(value).encode('utf-8') for value in arr]
+
+def format(arr, null=''):
+    """return values as text with masked values replaced by null
+    """
+    text = np.ma.getdata(arr).astype(str)
+    if np.ma.is_masked(arr):
+        text = np.where(np.ma.getmaskarray(arr), null, text)
+    return text
+
+def remove(filename):
+    """remove column file along with its offset and mask index
+    """
+    for name in (filename, filename + OFFSETS, filename + MASK):
+        if os.path.isfile(name):
+            os.remove(name)
+
+def nbytes(filename):
+    """return bytes on disk of column file along with its offset and mask index
+    """
+    return sum(os.path.getsize(name) for name in (filename, filename + OFFSETS, filename + MASK) if os.path.isfile(name))
+
+class LineWriter:
+    """
+    Appends newline terminated rows to an open binary file and records the byte offset of every row,
+    so the file can be read back by row range as a variable length column.
+    Anything written to the file before the first or after the last row, such as header, is not indexed.
+    """
+    def __init__(self, fh, filename, size):
+        self.fh = fh
+        self.size = size
+        self.row = 0
+        self.offsets = open_memmap(filename + OFFSETS, mode='w+', dtype=np.int64, shape=(size + 1,))
+        self.offsets[0] = fh.tell()
+
+    def write(self, lines):
+        stop = self.row + len(lines)
+        assert stop <= self.size, f'expected {self.size} rows, got at least {stop}'
+        lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines)) + 1
+        self.offsets[self.row + 1:stop + 1] = self.offsets[self.row] + np.cumsum(lengths)
+        if lines:
+            self.fh.write(b'\n'.join(lines))
+            self.fh.write(b'\n')
+        self.row = stop
+
+    def close(self):
+        self.offsets.flush()
+        del self.offsets
+
+class ColumnWriter:
+    """
+    Streams blocks of a column into the cache file.
+    Numeric, boolean and datetime blocks, or any block when a fixed width string dtype is given,
+    are written into a preallocated memory mapped .npy. Everything else is written as utf-8 rows.
+    Masked arrays keep their mask in a separate boolean .npy.
+    """
+    def __init__(self, filename, size, dtype=None):
+        self.filename = filename
+        self.size = size
+        self.dtype = dtype
+        self.row = 0
+        self.data = None
+        self.lines = None
+        self.mask = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self, arr):
+        dtype = np.dtype(self.dtype or arr.dtype)
+        if is_fixed(dtype) or (self.dtype is not None and dtype.kind in 'US'):
+            self.data = open_memmap(self.filename, mode='w+', dtype=dtype, shape=(self.size,) + arr.shape[1:])
+        else:
+            self.lines = LineWriter(open(self.filename, 'wb'), self.filename, self.size)
+
+    def write(self, arr):
+        if self.data is None and self.lines is None:
+            self.open(arr)
+        stop = self.row + len(arr)
+        if np.ma.is_masked(arr):
+            if self.mask is None:
+                self.mask = open_memmap(self.filename + MASK, mode='w+', dtype=bool, shape=(self.size,))
+            self.mask[self.row:stop] = np.ma.getmaskarray(arr)
+        arr = np.ma.getdata(arr)
+        if self.data is not None:
+            self.data[self.row:stop] = arr
+        else:
+            self.lines.write(encode(arr))
+        self.row = stop
+
+    def abort(self):
+        """close the handles and remove the partial column, without checking the rows written
+        """
+        if self.data is not None:
+            del self.data
+        if self.lines is not None:
+            del self.lines.offsets
+            self.lines.fh.close()
+        if self.mask is not None:
+            del self.mask
+        self.data = self.lines = self.mask = None
+        remove(self.filename)
+
+    def close(self):
+        if self.data is None and self.lines is None:
+            self.open(np.array([], dtype=self.dtype or str))
+        assert self.row == self.size, f'expected {self.size} rows in {self.filename}, got {self.row}'
+        if self.data is not None:
+            self.data.flush()
+            del self.data
+        else:
+            self.lines.close()
+            self.lines.fh.close()
+        if self.mask is not None:
+            self.mask.flush()
+            del self.mask
+
+def write_column(filename, arr, dtype=None):
+    with ColumnWriter(filename, len(arr), dtype=dtype) as writer:
+        writer.write(arr)
+    return filename
+
+class Column:
+    """
+    Memory mapped read access to a column written by ColumnWriter or LineWriter.
+    Slicing returns values (masked array if the column has a mask); lines returns the rows as text,
+    formatted by the column type for fixed width columns.
+    """
+    def __init__(self, filename, format=format):
+        self.filename = filename
+        self.format = format
+        if os.path.isfile(filename + OFFSETS):
+            self.offsets = np.load(filename + OFFSETS, mmap_mode='r')
+            if os.path.getsize(filename):
+                self.data = np.memmap(filename, dtype=np.uint8, mode='r')
+            else:
+                self.data = np.zeros(0, dtype=np.uint8)
+        else:
+            self.offsets = None
+            self.data = np.load(filename, mmap_mode='r')
+        if os.path.isfile(filename + MASK):
+            self.mask = np.load(filename + MASK, mmap_mode='r')
+        else:
+            self.mask = None
+
+    @property
+    def varlen(self):
+        return self.offsets is not None
+
+    def __len__(self):
+        if self.varlen:
+            return len(self.offsets) - 1
+        return len(self.data)
+
+    def raw(self, start, stop):
+        """return utf-8 rows [start, stop) of a variable length column without the masked values applied
+        """
+        block = self.data[self.offsets[start]:self.offsets[stop]].tobytes()
+        lines = block.split(b'\n')[:-1]
+        if len(lines) != stop - start:
+            # rows containing a newline can only be cut by offset
+            offsets = self.offsets[start:stop + 1] - self.offsets[start]
+            lines = [block[a:b - 1] for a, b in zip(offsets[:-1], offsets[1:])]
+        return lines
+
+    def __getitem__(self, key):
+        start, stop, _ = key.indices(len(self))
+        if self.varlen:
+            arr = np.array([line.decode('utf-8') for line in self.raw(start, stop)], dtype=str)
+        else:
+            arr = self.data[start:stop]
+        if self.mask is not None:
+            return np.ma.MaskedArray(arr, mask=self.mask[start:stop])
+        return arr
+
+    def lines(self, start, stop, null=b''):
+        """return rows [start, stop) as utf-8 text, with masked values replaced by null
+        """
+        if not self.varlen:
+            return encode(self.format(self[start:stop]))
+        lines = self.raw(start, stop)
+        if self.mask is not None:
+            for i in np.flatnonzero(self.mask[start:stop]):
+                lines[i] = null
+        return lines
+
+class Artifacts(dict):
+    """
+    Per run store of generated columns keyed by node.
+    A node is generated into its cache file once, every later consumer reads the column back from the file.
+    The store is not sent to worker process, it starts empty there.
+    """
+    async def column(self, node):
+        """return column of node, generate and write the node first if needed
+        """
+        if node not in self:
+            if node._file is None:
+                await node.write()
+            self[node] = Column(node._file, format=node.format)
+        return self[node]
+
+    def __reduce__(self):
+        return self.__class__, ()
+
+def iterate_lines(*columns, chunk_size=CHUNK_SIZE):
+    """yield list of utf-8 values per row across columns of the same length
+    """
+    size = min(len(column) for column in columns) if columns else 0
+    for start, stop in chunks(size, chunk_size):
+        yield from zip(*(column.lines(start, stop) for column in columns))
@@ -9,8 +9,10 @@ import enum
 import random
 import hashlib
 import json
+import asyncio
+import threading
 from typing import List, Dict, Tuple, Any
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime, date, time
 from functools import lru_cache
 import httpx
@@ -25,7 +27,8 @@ from genesynth.worker import WorkloadType, Runner, WorkerRegistry
 from genesynth.constraints import *
 from genesynth.graph import nx, find_node, find_child_node
 from genesynth.utils import Hashabledict, sorted_groupby
-from genesynth import mat
+from genesynth import mat, store, empirical
+from genesynth.version import __version__
 
 def reseed(seed=None):
     BaseMask.seed = seed
@@ -34,6 +37,45 @@ def reseed(seed=None):
 
 worker = WorkerRegistry()
 
+class StringPool:
+    """
+    Process-wide pool of distinct values drawn from a mimesis provider field.
+    The pool only ever grows, so every fixture sharing the provider reuses the values drawn so far.
+    """
+    def __init__(self, subtype, field=None, locale=Locale.EN, length=None, seed=None):
+        self.func = getattr(Generic(locale=locale, seed=seed), subtype)
+        if field is not None:
+            self.func = getattr(self.func, field)
+        self.length = length
+        self.values = {}
+        self.array = np.array([], dtype=str)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.values)
+
+    def grow(self, size, retry=10):
+        """return the first size distinct values, drawing from the provider until the pool holds them
+        values are drawn in a fixed seeded order, so the prefix is the same whichever fixture grew the pool first.
+        gives up after size * retry consecutive duplicates, as the provider may be exhausted
+        """
+        with self.lock:
+            misses = 0
+            while len(self.values) < size and misses < size * retry:
+                value = str(self.func())[:self.length]
+                if value in self.values:
+                    misses += 1
+                else:
+                    self.values[value] = None
+                    misses = 0
+            if len(self.array) != len(self.values):
+                self.array = np.array(list(self.values))
+        return self.array[:size]
+
+@lru_cache(maxsize=None)
+def string_pool(subtype, field=None, locale=Locale.EN, length=None, seed=None):
+    return StringPool(subtype, field, locale=locale, length=length, seed=seed)
+
 class Datatypes(dict):
     def register(self, alias: List):
         def wraps(obj):
@@ -46,6 +88,17 @@ class Datatypes(dict):
 types = Datatypes()
 datatypes = types
 
+def cache_value(value):
+    """return value with nodes replaced by their cache key and containers by tuples, so its repr is stable
+    """
+    if isinstance(value, BaseMask):
+        return value.cache_key()
+    if isinstance(value, dict):
+        return tuple((cache_value(k), cache_value(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(map(cache_value, value))
+    return value
+
 @dataclass(unsafe_hash=True)
 class BaseMask:
     is_data = True
@@ -58,11 +111,19 @@ class BaseMask:
     _constraints = []
     _index = None
     _mask = None
+    _order = None # order statistics at the row block boundaries of a sorted column
+    _span = None # (start, stop) rows of the column written by this node when sharded
     _file = None # cache filename
     _hashfile = True
     _path = None # cache directory
     _defer = None # parent node if deferred
     _dist = None
+    _copula = None # (table name, row of the cholesky factor) of the gaussian copula the column is correlated by
+    _artifacts = None # store of generated columns shared by the run
+    monotone = False # values are generated in ascending order
+    width = 16 # estimated characters of a value as text
+    fixed = False # values are kept in a fixed width column of itemsize bytes
+    rate = None # seconds per row the planner assumes instead of timing the node, for types calling a service
 
     # TODO handle notnull and unique constraits
 
@@ -83,6 +144,18 @@ class BaseMask:
     def unique(self):
         return 'unique' in self._constraints
 
+    @property
+    def span(self):
+        """rows (start, stop) of the column this node writes, the whole column unless sharded
+        """
+        return self._span or (0, self.size)
+
+    @property
+    def artifacts(self):
+        if self._artifacts is None:
+            self._artifacts = store.Artifacts()
+        return self._artifacts
+
     @property
     def dist(self):
         if self._dist:
@@ -102,24 +175,69 @@ class BaseMask:
         return {k: list(filter(None, (i[-1] for i in v))) 
             for k, v in sorted_groupby(constraints, lambda x: x[0])}
 
-    @lru_cache(maxsize=None)
     def mask(self):
+        # cached on the instance, equal fixtures share lru_cache entries
+        if self._mask is None:
+            self._mask = self.null_mask(0, self.size)
+        return self._mask
+
+    def null_mask(self, start, stop):
         if 'notnull' in self._constraints:
-            return mat.null_percent(self.size, percent=0)
+            return mat.null_percent(stop - start, percent=0)
         elif 'nullable' in self._constraints:
-            mask = mat.identity(self.size, matmul=True)
-            for value in self._constraints['nullable']:
-                mask &= mat.null_percent(self.size, percent=value)
-            return mask
+            return self.draw(self.null_block, start, stop, 'null')
+
+    def null_block(self, start, stop, rng):
+        mask = mat.identity(stop - start, matmul=True)
+        for value in self._constraints['nullable']:
+            mask &= mat.null_percent(stop - start, percent=value, rng=rng)
+        return mask
+
+    def rng(self, *keys, block=0):
+        """return the counter based generator of a row block for the stream of this node named by keys
+        """
+        return mat.rng(self.seed, self.name, *keys, block=block)
+
+    def draw(self, fn, start, stop, *keys):
+        """return fn(block start, block stop, rng) over the fixed row blocks covering rows [start, stop),
+        sliced to the rows. every block draws from its own generator, so rows come out the same
+        however the column is split or ordered
+        """
+        arrs = [fn(a, b, self.rng(*keys, block=block))[max(start, a) - a:stop - a]
+                for block, a, b in mat.blocks(start, stop, self.size)]
+        if len(arrs) == 1:
+            return arrs[0]
+        elif not arrs:
+            return fn(start, stop, self.rng(*keys))
+        return np.concatenate(arrs)
 
     def dist_generate(self, *args, **kwargs):
         if not args and self.dist == 'uniform':
             args = (0, 1)
         return mat.stats_model_generate(self.size, *args, model=self.dist, unique=self.unique, **self.dist_params)
 
-    @staticmethod
-    def dist_fit(arr):
-        return mat.stats_model_fit(arr, model=self.dist, **self.dist_params)
+    def dist_fit(self, arr):
+        return mat.stats_model_fit(arr, model=self.dist)
+
+    @property
+    def fitted(self):
+        """InverseCDF fitted from the sample file of an empirical or kde dist, None for the other dist
+        """
+        if self.dist in empirical.METHODS:
+            return empirical.fit(self.dist, **self.dist_params)
+
+    def dist_values(self, start, stop, rng):
+        """return rows [start, stop) drawn from the dist between min and max, the fitted dist ignores the bounds
+        """
+        if self.fitted is not None:
+            return mat.table_generate(self.fitted, self.size, unique=self.unique, rows=(start, stop), rng=rng)
+        return mat.stats_model_generate(self.size, self.min, self.max, model=self.dist, unique=self.unique,
+                                        rows=(start, stop), rng=rng, **self.dist_params)
+
+    def dist_quantile(self, p):
+        if self.fitted is not None:
+            return self.fitted(p)
+        return mat.stats_model_quantile(p, self.min, self.max, model=self.dist, **self.dist_params)
 
     @staticmethod
     def index_value(arr):
@@ -143,49 +261,239 @@ class BaseMask:
             assert len(index) == unique.size, f'{self.name} only has {unique.size}/{len(index)} unique value'
         return index
 
-    def apply_index(self, arr, null=''):
+    def apply_index(self, arr):
         mask = self.mask()
         index = self.index(arr)
-        # TODO remove the need to cast array as str
-        return mat.nullable(arr[index].astype(str), mask=mask, null=null).filled()
+        return mat.nullable(arr[index], mask=mask, null=self.null)
+
+    def apply_chunk(self, arr, start=0):
+        """mask a block of rows starting at row start that was already generated in its final order
+        """
+        mask = self.null_mask(start, start + len(arr))
+        return mat.nullable(arr, mask=mask, null=self.null)
+
+    def stringify(self, arr):
+        """return unmasked values as text
+        """
+        return arr.astype(str)
+
+    def format(self, arr):
+        """return values as text for output, masked values as empty string
+        the null sentinel of the type only applies to the in memory array
+        """
+        return mat.nullable(self.stringify(np.ma.getdata(arr)), mask=np.ma.getmaskarray(arr), null='').filled()
+
+    def tolist(self, arr):
+        """return values as python objects for json output, masked values as None
+        """
+        return [None if masked else value for value, masked in zip(self.format(arr).tolist(), np.ma.getmaskarray(arr))]
+
+    def jsonify(self, arr):
+        """return values as json text for output, masked values as null
+        """
+        text = np.array(list(map(json.encoder.encode_basestring_ascii, self.format(arr).tolist())), dtype=str)
+        return np.where(np.ma.getmaskarray(arr), 'null', text)
+
+    def values(self, start, stop, rng):
+        """return the unmasked values of rows [start, stop) drawn from the random generator rng
+        """
+        raise NotImplementedError(f'{self.__class__.__name__} does not have values defined')
+
+    def quantile(self, p):
+        """return the values at cumulative probability p, ascending for sorted p
+        """
+        raise NotImplementedError(f'{self.__class__.__name__} does not have quantile defined')
+
+    @property
+    def correlatable(self):
+        """whether the column can be drawn from a gaussian copula, which needs the quantile of its values
+        """
+        return type(self).quantile is not BaseMask.quantile
+
+    @property
+    def chunked(self):
+        """whether rows can be generated block by block instead of as a whole column
+        sorted constraint needs values generated in ascending order or from sorted quantiles
+        """
+        if type(self).values is BaseMask.values:
+            return False
+        if self.unique and self._copula is None and not self.monotone:
+            # only ascending values can be checked for dupes a block at a time
+            return False
+        if 'sorted' in self._constraints:
+            return self.monotone or type(self).quantile is not BaseMask.quantile
+        return True
+
+    def rows(self, start, stop):
+        """return the unmasked values of rows [start, stop)
+        a type that can not be chunked draws the whole column from a single stream
+        """
+        if self._copula is not None:
+            return self.quantile(self.correlated(start, stop))
+        if not self.chunked:
+            return self.values(start, stop, self.rng())
+        if 'sorted' in self._constraints and not self.monotone:
+            return self.quantile(self.draw(self.sorted_block, start, stop, 'sorted'))
+        return self.draw(self.values, start, stop)
+
+    def correlated(self, start, stop):
+        """return rows [start, stop) of the column of the gaussian copula as uniform, the same for every column of the table
+        """
+        name, factor = self._copula
+        return mat.correlated_uniform(factor, start, stop, self.size, self.seed, name, 'correlation')
+
+    def sorted_block(self, start, stop, rng):
+        """return sorted uniform sample for a block of rows, between the order statistics at its boundaries
+        """
+        if self._order is None:
+            self._order = mat.order_bounds(self.size, rng=self.rng('order'))
+        lows, highs = self._order
+        block = start // mat.CHUNK_SIZE
+        return mat.sorted_block(lows[block], highs[block], stop - start, last=stop == self.size, rng=rng)
 
     async def generate(self):
-        raise NotImplementedError(f'{self.__class__.__name__} does not have generate defined')
+        return self.apply_index(self.rows(0, self.size))
+
+    async def generate_chunks(self, chunk_size=mat.CHUNK_SIZE):
+        """yield the column in blocks of chunk_size rows
+        only one block is held in memory unless the type can not be chunked, in which case
+        the whole column is generated once and sliced
+        """
+        start, stop = self.span
+        if not self.chunked:
+            arr = await self.generate()
+            for a, b in mat.chunks(stop, chunk_size, start):
+                yield arr[a:b]
+            return
+        last = None
+        for a, b in mat.chunks(stop, chunk_size, start):
+            arr = self.rows(a, b)
+            if self.unique and self._copula is None:
+                last = self.check_ascending(arr, last)
+            yield self.apply_chunk(arr, a)
+            await asyncio.sleep(0)
+
+    def check_ascending(self, arr, last=None):
+        """assert a block of a unique ascending column has no dupe, also against the last value of the block before
+        return the last value of the block
+        """
+        if not len(arr):
+            return last
+        assert np.all(arr[1:] > arr[:-1]) and (last is None or arr[0] > last), f'{self.name} should be unique, found dupe'
+        return arr[-1]
+
+    async def read(self, start, stop):
+        """return rows [start, stop) of the column from the cache file, written first if needed
+        rows outside the span of a sharded node are drawn again, which gives the same rows
+        """
+        a, b = self.span
+        if a <= start and stop <= b:
+            column = await self.artifacts.column(self)
+            return column[start - a:stop - a]
+        if self.chunked:
+            return self.apply_chunk(self.rows(start, stop), start)
+        arr = await self.generate()
+        return arr[start:stop]
+
+    @property
+    def itemsize(self):
+        """estimated bytes per row in the cache file, a text row also takes a newline and its offset
+        """
+        return 8 if self.fixed else self.width + 9
+
+    def nbytes(self):
+        """estimated bytes of the cache file holding the rows of the span
+        """
+        start, stop = self.span
+        return (stop - start) * (self.itemsize + ('nullable' in self._constraints))
+
+    def memory(self):
+        """estimated bytes held in memory while the node is written, one block of rows unless the type can not be chunked
+        """
+        start, stop = self.span
+        rows = stop - start if not self.chunked else min(stop - start, mat.CHUNK_SIZE)
+        # numpy keeps text as fixed width utf-32
+        return rows * ((self.itemsize if self.fixed else 4 * self.width) + 1)
+
+    def spill(self):
+        """drop values cached in memory once the column is written, they are drawn again if needed
+        """
+        self._mask = None
+        self._order = None
+
+    def cache_params(self):
+        """return everything the values of the node depend on as plain data
+        """
+        params = {f.name: getattr(self, f.name) for f in fields(self) if f.name != 'graph'}
+        params = (__version__, type(self).__module__, type(self).__qualname__, cache_value(params),
+                  cache_value(getattr(self, 'metadata', self._metadata)), cache_value(self._constraints), cache_value(self._dist),
+                  self.span, self.seed)
+        if self.dist in empirical.METHODS:
+            # a fitted dist also depends on the content of its sample file
+            params += (empirical.fit_key(self.dist, **self.dist_params),)
+        if self._copula is not None:
+            params += (cache_value(self._copula),)
+        return params
+
+    def cache_key(self):
+        """return digest of cache_params, the same in every process. unseeded nodes draw new values every run and have no key
+        """
+        if self.seed is None:
+            return None
+        return hashlib.md5(repr(self.cache_params()).encode('utf-8')).hexdigest()
+
+    @property
+    def filename(self):
+        if self._hashfile:
+            filename = hashlib.md5(self.name.encode('ascii')).hexdigest()
+        else:
+            filename = self.name
+        if self._path is not None:
+            return os.path.join(self._path, filename)
+        return filename
 
-    async def write(self):
+    async def write(self, arr=None):
+        """write the cache file, from arr if it was already generated
+        """
         if self._file is not None:
             return
+        filename = self.filename
+        start, stop = self.span
         if isinstance(self, BaseArrayFixture):
-            arr = await self.generate()
-            arr = np.array(arr)
-            if arr.ndim > 2:
-                arr = np.squeeze(arr) # TODO temporary hack. need to figure out how to output this better
+            if arr is None:
+                arr = await self.generate()
+            rows = zip(*(node.tolist(values[start:stop]) for node, values in zip(self.children, arr)))
+            store.write_column(filename, np.array([json.dumps(list(row)) for row in rows], dtype=str))
+        elif arr is not None:
+            store.write_column(filename, arr[start:stop])
         else:
-            arr = await self.generate()
-        if self._path is not None:
-            if self._hashfile:
-                filename = os.path.join(self._path, hashlib.md5(self.name.encode('ascii')).hexdigest())
-            else:
-                filename = os.path.join(self._path, self.name)
-        else:
-            if self._hashfile:
-                filename = hashlib.md5(self.name.encode('ascii')).hexdigest()
-            else:
-                filename = self.name
-        np.savetxt(filename, arr, fmt='%s', delimiter='\n')
+            with store.ColumnWriter(filename, stop - start) as writer:
+                async for arr in self.generate_chunks():
+                    writer.write(arr)
         self._file = filename
 
     def __str__(self):
         return f"{self.__class__.__name__}(name='{self.name}', size={self.size})"
 
     def __del__(self, *args, **kwargs):
-        if self._file and os.path.isfile(self._file):
-            os.remove(self._file)
+        if self._file:
+            store.remove(self._file)
 
 @dataclass(unsafe_hash=True)
 class BaseNumberFixture(BaseMask):
     null = np.nan
-    pass
+    fixed = True
+
+    def tolist(self, arr):
+        return [None if masked else value for value, masked in zip(np.ma.getdata(arr).tolist(), np.ma.getmaskarray(arr))]
+
+    def jsonify(self, arr):
+        data = np.ma.getdata(arr)
+        if data.dtype.kind == 'f':
+            text = np.array(list(map(float.__repr__, data.tolist())), dtype=str)
+        else:
+            text = self.stringify(data)
+        return np.where(np.ma.getmaskarray(arr), 'null', text)
 
 @types.register(['enum'])
 @dataclass(unsafe_hash=True)
@@ -198,22 +506,58 @@ class BaseTextFixture(BaseMask):
         if self.unique:
             self.replace = False
 
-    async def generate(self):
-        arr = mat.sample(self.size, self.options, replace=self.replace)
-        return self.apply_index(arr)
+    @property
+    def chunked(self):
+        # sampling without replacement has to see the whole column
+        return self.replace and super().chunked
+
+    @property
+    def width(self):
+        return max((len(str(option)) for option in self.options), default=0)
+
+    def values(self, start, stop, rng):
+        return mat.sample(stop - start, self.options, replace=self.replace, rng=rng)
+
+    def quantile(self, p):
+        return mat.sample_quantile(p, self.options)
+
+    @property
+    def literals(self):
+        """options that are not strings by their text, written to json as they are
+        mixed options are kept in an array of a common type, so 3 may be stored as 3.0
+        """
+        texts = np.array(self.options).astype(str).tolist() if self.options else []
+        return {key: option for option, text in zip(self.options, texts) if not isinstance(option, str)
+                for key in (str(option), text)}
+
+    def tolist(self, arr):
+        literals = self.literals
+        return [literals.get(value, value) if value is not None else None for value in super().tolist(arr)]
+
+    def jsonify(self, arr):
+        literals = {text: json.dumps(option) for text, option in self.literals.items()}
+        if not literals:
+            return super().jsonify(arr)
+        text = [literals.get(value) or json.encoder.encode_basestring_ascii(value) for value in self.format(arr).tolist()]
+        return np.where(np.ma.getmaskarray(arr), 'null', np.array(text, dtype=str))
 
 @types.register(['text'])
 @dataclass(unsafe_hash=True)
 class BaseTextFixture(BaseMask):
     length: int = None
+    average = 32 # estimated characters of a value without length limit
 
     def __post_init__(self):
         self.random = Random(self.seed)
 
-    async def generate(self):
+    @property
+    def width(self):
+        return min(self.average, self.length or self.average)
+
+    def values(self, start, stop, rng):
         # TODO add support to ensure unique constraint
-        arr = np.array([self.random.randstr()[:self.length] for _ in range(self.size)])
-        return self.apply_index(arr)
+        self.random.seed(int(rng.integers(2 ** 63)))
+        return np.array([self.random.randstr()[:self.length] for _ in range(stop - start)])
 
 @types.register(['timestamp', 'datetime'])
 @dataclass(unsafe_hash=True)
@@ -221,35 +565,95 @@ class BaseTimestamp(BaseMask):
     min: datetime = datetime.fromtimestamp(0)
     max: datetime = datetime.now()
     posix: bool = False
+    fixed = True
+    width = 26
 
-    async def generate(self):
-        arr = pd.date_range(self.min, self.max, periods=self.size)
+    @property
+    def monotone(self):
+        if self.dist in empirical.METHODS:
+            return self.unique
+        return self.bounds[0] <= self.bounds[1]
+
+    @property
+    def bounds(self):
+        return pd.Timestamp(self.min), pd.Timestamp(self.max)
+
+    def date_range(self, start, stop):
+        """return rows [start, stop) of pd.date_range(min, max, periods=size)
+        """
+        min, max = self.bounds
+        arr = mat.linspace(0, max.value - min.value, self.size, start, stop, dtype=np.int64) + min.value
+        return pd.DatetimeIndex(arr.astype('datetime64[ns]'))
+
+    def timestamps(self, start, stop, rng=None):
+        """return rows [start, stop) drawn from the fitted dist, nanoseconds since epoch, or evenly spaced from min to max
+        """
+        if self.fitted is None:
+            return self.date_range(start, stop)
+        arr = mat.table_generate(self.fitted, self.size, unique=self.unique, rows=(start, stop), rng=rng or self.rng())
+        return pd.DatetimeIndex(np.round(arr).astype(np.int64).astype('datetime64[ns]'))
+
+    def values(self, start, stop, rng=None):
+        arr = self.timestamps(start, stop, rng)
         if not self.posix:
-            arr = arr.to_pydatetime()
-        else:
-            arr = (arr.values.astype(int) // 10**9) + (arr.microsecond / 10**6)
-        return self.apply_index(arr)
+            return arr.values
+        return (arr.values.astype(int) // 10**9) + (arr.microsecond / 10**6)
+
+    def tolist(self, arr):
+        if np.ma.getdata(arr).dtype.kind == 'f':
+            return BaseNumberFixture.tolist(self, arr)
+        return super().tolist(arr)
+
+    def jsonify(self, arr):
+        # posix timestamps are numbers
+        if np.ma.getdata(arr).dtype.kind == 'f':
+            return BaseNumberFixture.jsonify(self, arr)
+        return super().jsonify(arr)
+
+    def stringify(self, arr):
+        if self.posix:
+            return arr.astype(str)
+        # same text as str(datetime), which drops zero microseconds
+        text = np.char.replace(np.datetime_as_string(arr, unit='us'), 'T', ' ')
+        return np.char.replace(text, '.000000', '')
 
 @types.register(['date'])
 @dataclass(unsafe_hash=True)
 class BaseDate(BaseTimestamp):
-    async def generate(self):
-        arr = pd.date_range(self.min, self.max, periods=self.size).date
-        return self.apply_index(arr)
+    width = 10
+
+    def values(self, start, stop, rng=None):
+        return self.timestamps(start, stop, rng).values.astype('datetime64[D]')
+
+    def stringify(self, arr):
+        return arr.astype(str)
 
 @types.register(['time'])
 @dataclass(unsafe_hash=True)
 class BaseTime(BaseTimestamp):
     min: time = time(0)
     max: time = time(23, 59, 59)
+    width = 15
 
-    async def generate(self):
+    @property
+    def bounds(self):
         min = datetime.fromtimestamp(0).replace(hour=self.min.hour, minute=self.min.minute,
             second=self.min.second, microsecond=self.min.microsecond)
         max = datetime.fromtimestamp(0).replace(hour=self.max.hour, minute=self.max.minute,
             second=self.max.second, microsecond=self.max.microsecond)
-        arr = pd.date_range(min, max, periods=self.size).time
-        return self.apply_index(arr)
+        return pd.Timestamp(min), pd.Timestamp(max)
+
+    def values(self, start, stop, rng=None):
+        """return time of day as microseconds since midnight
+        """
+        arr = self.timestamps(start, stop, rng).values
+        return (arr - arr.astype('datetime64[D]')).astype('timedelta64[us]')
+
+    def stringify(self, arr):
+        # same text as str(time), which drops zero microseconds
+        text = np.datetime_as_string(np.datetime64(0, 'us') + arr, unit='us').astype('U26')
+        text = np.ascontiguousarray(text.view('U1').reshape(len(text), 26)[:, 11:]).view('U15').ravel()
+        return np.char.replace(text, '.000000', '')
 
 @types.register(['foreign'])
 @dataclass(unsafe_hash=True)
@@ -272,9 +676,40 @@ class BaseForeign(BaseMask):
             self.graph.add_edge(self.node, self, label='fkey', type='fkey')
 
     async def generate(self):
-        arr = await self.node.generate()
+        # read back the values the referenced node wrote instead of drawing new ones
+        arr = await self.node.read(0, self.size)
         return self.apply_index(arr)
 
+    async def generate_chunks(self, chunk_size=mat.CHUNK_SIZE):
+        if 'sorted' in self._constraints or self.unique:
+            async for arr in super().generate_chunks(chunk_size):
+                yield arr
+            return
+        # rows are copied by position, so a shard only needs the same rows of the referenced node
+        start, stop = self.span
+        for a, b in mat.chunks(stop, chunk_size, start):
+            yield self.apply_chunk(await self.node.read(a, b), a)
+
+    @property
+    def width(self):
+        return self.node.width
+
+    @property
+    def fixed(self):
+        return self.node.fixed
+
+    def cache_params(self):
+        return super().cache_params() + (self.node.cache_key(),)
+
+    def stringify(self, arr):
+        return self.node.stringify(arr)
+
+    def tolist(self, arr):
+        return self.node.tolist(arr)
+
+    def jsonify(self, arr):
+        return self.node.jsonify(arr)
+
 @types.register(['array', 'list', 'tuple'])
 @dataclass(unsafe_hash=True)
 class BaseArrayFixture(BaseMask):
@@ -284,6 +719,10 @@ class BaseArrayFixture(BaseMask):
     def __post_init__(self):
         self.children = tuple(self.children)
 
+    @property
+    def width(self):
+        return 2 + sum(node.width + 2 for node in self.children if isinstance(node, BaseMask))
+
     async def __aiter__(self):
         for node in self.children:
             if isinstance(node, BaseMask):
@@ -295,6 +734,14 @@ class BaseArrayFixture(BaseMask):
     async def generate(self):
         return [arr async for arr in self]
 
+    def tolist(self, arr):
+        return [None if masked else json.loads(value) for value, masked in zip(arr.tolist(), np.ma.getmaskarray(arr))]
+
+    def jsonify(self, arr):
+        """rows are already json text
+        """
+        return np.where(np.ma.getmaskarray(arr), 'null', np.ma.getdata(arr))
+
 @types.register(['map', 'struct'])
 @dataclass(unsafe_hash=True)
 class BaseMapFixture(BaseMask):
@@ -304,6 +751,10 @@ class BaseMapFixture(BaseMask):
     def __post_init__(self):
         self.children = Hashabledict(self.children)
 
+    @property
+    def width(self):
+        return 2 + sum(len(node.name.split('.')[-1]) + node.width + 6 for node in self.children.values() if isinstance(node, BaseMask))
+
     async def __aiter__(self):
         for key, node in self.children.items():
             if isinstance(node, BaseMask):
@@ -325,9 +776,19 @@ class IntegerFixture(BaseNumberFixture):
 
     # TODO add type conversio to Serial when constraint is incremental
 
-    async def generate(self):
-        arr = mat.stats_model_generate(self.size, self.min, self.max, model=self.dist, unique=self.unique, **self.dist_params).astype(int)
-        return self.apply_index(arr)
+    @property
+    def width(self):
+        return max(len(str(self.min)), len(str(self.max)))
+
+    @property
+    def monotone(self):
+        return self.unique
+
+    def values(self, start, stop, rng):
+        return self.dist_values(start, stop, rng).astype(int)
+
+    def quantile(self, p):
+        return self.dist_quantile(p).astype(int)
 
 @types.register(['serial'])
 @dataclass(unsafe_hash=True)
@@ -336,27 +797,52 @@ class SerialFixture(BaseNumberFixture):
     step: int = 1
     null = 0
 
-    async def generate(self):
-        arr = np.arange(self.min, self.min + self.size * self.step, self.step)
-        return self.apply_index(arr)
+    @property
+    def width(self):
+        return max(len(str(self.min)), len(str(self.min + self.step * self.size)))
+
+    @property
+    def monotone(self):
+        return self.step >= 0
+
+    def values(self, start, stop, rng=None):
+        return self.min + self.step * np.arange(start, stop)
 
 @types.register(['boolean'])
 @dataclass(unsafe_hash=True)
 class BooleanFixture(BaseNumberFixture):
-    async def generate(self):
-        arr = np.random.randint(0, 2, self.size).astype(bool)
-        arr = np.where(arr==True, 'true', np.where(arr==False, 'false', arr))
-        return self.apply_index(arr)
+    width = 5
+    itemsize = 1
+
+    @staticmethod
+    def boolean(arr):
+        return np.where(arr==True, 'true', np.where(arr==False, 'false', arr))
+
+    def values(self, start, stop, rng):
+        return rng.random(stop - start) < 0.5
+
+    def quantile(self, p):
+        return p >= 0.5
+
+    def stringify(self, arr):
+        return self.boolean(arr)
 
 @types.register(['float', 'double'])
 @dataclass(unsafe_hash=True)
 class FloatFixture(BaseNumberFixture):
     min: int = -1
     max: int = 1
+    width = 20
 
-    async def generate(self):
-        arr = mat.stats_model_generate(self.size, self.min, self.max, model=self.dist, unique=self.unique, **self.dist_params)
-        return self.apply_index(arr)
+    @property
+    def monotone(self):
+        return self.unique
+
+    def values(self, start, stop, rng):
+        return self.dist_values(start, stop, rng)
+
+    def quantile(self, p):
+        return self.dist_quantile(p)
 
 @types.register(['decimal', 'numeric'])
 @dataclass(unsafe_hash=True)
@@ -364,10 +850,11 @@ class DecimalFixture(FloatFixture):
     precision: int = 16
     scale: int = 3
 
-    async def generate(self):
-        arr = mat.stats_model_generate(self.size, self.min, self.max, model=self.dist, unique=self.unique, **self.dist_params)
-        arr = np.round(arr, self.scale)
-        return self.apply_index(arr)
+    def values(self, start, stop, rng):
+        return np.round(super().values(start, stop, rng), self.scale)
+
+    def quantile(self, p):
+        return np.round(super().quantile(p), self.scale)
 
 @types.register(['string'])
 @dataclass(unsafe_hash=True)
@@ -375,31 +862,72 @@ class StringFixture(BaseTextFixture):
     null = ''
     subtype: str = 'text'
     field: str = 'sentence'
+    pool: int = None
     locale = Locale.EN
+    average = 64
 
     def __post_init__(self):
-        self.generic = Generic(locale=self.locale, seed=self.seed)
+        if self.pool is None:
+            self.generic = Generic(locale=self.locale, seed=self.seed)
 
-    @worker.register
-    async def generate(self):
+    @property
+    def string_pool(self):
+        seed = mat.ENTROPY if self.seed is None else self.seed
+        return string_pool(self.subtype, self.field, locale=self.locale, length=self.length, seed=seed)
+
+    @property
+    def correlatable(self):
+        # only pool values have a quantile
+        return self.pool is not None
+
+    @property
+    def chunked(self):
+        # unique pool sampling has to see the whole column, and only pool values can be sorted
+        if self.pool is None:
+            return 'sorted' not in self._constraints and super().chunked
+        return not self.unique and super().chunked
+
+    def sample_pool(self, size, rng):
+        """fill rows by sampling indices into the shared provider pool
+        unique constraint grows the pool to at least size and samples without replacement
+        """
+        if self.unique:
+            arr = self.string_pool.grow(max(self.pool, size))
+            assert arr.size >= size, f'{self.name} only has {arr.size}/{size} unique value'
+            return arr[rng.choice(arr.size, size, replace=False)]
+        arr = self.string_pool.grow(self.pool)
+        return arr[rng.integers(0, arr.size, size)]
+
+    def values(self, start, stop, rng):
+        if self.pool is not None:
+            return self.sample_pool(stop - start, rng)
+        self.generic.reseed(int(rng.integers(2 ** 63)))
         func = getattr(self.generic, self.subtype)
         if self.field is not None:
             func = getattr(func, self.field)
         # TODO add support to ensure unique constraint
-        arr = np.array([str(func())[:self.length] for _ in range(self.size)])
-        return self.apply_index(arr)
+        return np.array([str(func())[:self.length] for _ in range(stop - start)])
+
+    def quantile(self, p):
+        arr = np.sort(self.string_pool.grow(self.pool))
+        return arr[np.minimum((p * arr.size).astype(int), arr.size - 1)]
 
     @worker.register
-    async def write(self):
-        return await super().write()
+    async def generate(self):
+        return await super().generate()
+
+    @worker.register
+    async def write(self, arr=None):
+        return await super().write(arr)
 
 @types.register(['password'])
 @dataclass(unsafe_hash=True)
 class BcryptPassword(BaseTextFixture):
     rounds: int = 12
     prefix: str = '2b'
+    width = 60
 
-    async def generate(self):
-        arr = np.array([f'${self.prefix}${self.rounds}${self.random.randstr(length=53)}' for _ in range(self.size)])
-        return self.apply_index(arr)
+    def values(self, start, stop, rng):
+        self.random.seed(int(rng.integers(2 ** 63)))
+        return np.array([f'${self.prefix}${self.rounds}${self.random.randstr(length=53)}' for _ in range(stop - start)])
 
@@ -1,4 +1,4 @@
-import re
+import json
 from itertools import groupby
 from functools import wraps
 from contextlib import contextmanager
@@ -15,10 +15,27 @@ class Hashabledict(dict):
     def __hash__(self):
         return hash(frozenset(self))
 
-def clean_text(line):
-    line = re.sub(r'"(?P<num>[-0-9.]+)"', r'\g<num>', line)
-    line = re.sub(r'"(?P<bool>true|false)"', r'\g<bool>', line)
-    return line
+def quote(value):
+    """return value with numbers and booleans of nested dicts and lists quoted as strings
+    """
+    if isinstance(value, dict):
+        return {k: quote(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return list(map(quote, value))
+    if isinstance(value, (bool, int, float)):
+        return json.dumps(value)
+    return value
+
+def stringify(line):
+    """return json line with numbers and booleans quoted as strings, other lines are returned as is
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return line
+    if not isinstance(record, (dict, list)):
+        return line
+    return json.dumps(quote(record)) + '\n'
 
 def sorted_groupby(arr, func, reverse=False):
     return groupby(sorted(arr, key=func, reverse=reverse), key=func)
@@ -4,11 +4,20 @@ Worker is the uilitiy library that handles how to create worker process or other
 
 import os
 import enum
+import uuid
+import typing
 import asyncio
+import atexit
+import weakref
+import tempfile
+import threading
 import functools
+from contextlib import nullcontext
 from multiprocessing import Manager, cpu_count
 from concurrent import futures
+import numpy as np
 from genesynth.utils import spawn
+from genesynth import store
 
 class WorkloadType(enum.Enum):
     DEFAULT = 'asyncio'
@@ -20,27 +29,157 @@ class WorkerRegistry(dict):
         self[fn.__qualname__] = fn
         return fn
 
+class SharedArray(typing.NamedTuple):
+    """
+    Descriptor of an array result left by a worker process in a memory mapped column file,
+    sent back in place of the pickled array.
+    """
+    filename: str
+    dtype: str
+    shape: tuple
+    masked: bool
+
+    def attach(self):
+        """return the array mapped from the file without copy
+        the file is unlinked right away, the mapping keeps the data until the array is released
+        """
+        arr = store.Column(self.filename)[:]
+        store.remove(self.filename)
+        if self.masked and not isinstance(arr, np.ma.MaskedArray):
+            arr = np.ma.MaskedArray(arr, mask=False)
+        return arr
+
+def share(directory, fn, *args, profile=None, **kwargs):
+    """run fn in the worker process, an array result is written to a file under directory
+    and replaced by its SharedArray descriptor, any other result is returned as is.
+    profile wraps the run if given
+    """
+    if profile is not None:
+        result = profile(spawn, fn, *args, **kwargs)
+    else:
+        result = spawn(fn, *args, **kwargs)
+    if not isinstance(result, np.ndarray) or result.dtype.kind not in 'biufcmMUS':
+        return result
+    filename = os.path.join(directory, uuid.uuid4().hex)
+    store.write_column(filename, result, dtype=result.dtype)
+    return SharedArray(filename, result.dtype.str, result.shape, isinstance(result, np.ma.MaskedArray))
+
+class PoolManager:
+    """
+    Process and thread pools created on first use and shared by every Runner and Orchestration,
+    so importing or building a pipeline does not start any worker.
+    """
+    def __init__(self, processes=None, threads=10):
+        self.processes = processes or cpu_count()
+        self.threads = threads
+        self._process = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def process(self):
+        with self._lock:
+            if self._process is None:
+                self._process = futures.ProcessPoolExecutor(self.processes)
+            return self._process
+
+    @property
+    def thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = futures.ThreadPoolExecutor(self.threads)
+            return self._thread
+
+    def configure(self, processes=None, threads=None):
+        """resize the pools, running pools are shut down and recreated on next use
+        """
+        if processes and processes != self.processes or threads and threads != self.threads:
+            self.shutdown()
+        self.processes = processes or self.processes
+        self.threads = threads or self.threads
+
+    def warm(self):
+        """start every worker process ahead of the first dispatch
+        """
+        for future in [self.process.submit(os.getpid) for _ in range(self.processes)]:
+            future.result()
+        self.thread
+
+    def reset(self):
+        """forget pools inherited by a forked process, new ones are created on first use
+        """
+        self._process = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            for executor in (self._process, self._thread):
+                if executor is not None:
+                    executor.shutdown(wait=wait)
+            self._process = None
+            self._thread = None
+
+pools = PoolManager()
+atexit.register(pools.shutdown)
+os.register_at_fork(after_in_child=pools.reset)
+
 class Runner:
-    def __init__(self, registry, workers=cpu_count()):
+    """
+    Dispatches registered methods to the process pool, the shared pools unless workers is given.
+    Pools of its own are shut down on close, or once the runner is garbage collected.
+    """
+    def __init__(self, registry, workers=None, pools=pools):
+        self._shutdown = None
+        if workers is not None and workers != pools.processes:
+            pools = PoolManager(processes=workers)
+            self._shutdown = weakref.finalize(self, pools.shutdown)
         self.registry = registry
-        self.max_workers = workers
-        self.executor = futures.ProcessPoolExecutor(workers)
+        self.pools = pools
+        self.dir = tempfile.TemporaryDirectory(prefix='genesynth_')
         self.methods = {qualname: self._wraps(fn) for qualname, fn in registry.items()}
 
+    def close(self):
+        """shut down the pools the runner created, the shared pools are left running
+        """
+        if self._shutdown is not None:
+            self._shutdown()
+        self.dir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def max_workers(self):
+        return self.pools.processes
+
+    @property
+    def executor(self):
+        return self.pools.process
+
     @property
     def loop(self):
         return asyncio.get_running_loop()
 
     def _wraps(self, fn):
         @functools.wraps(fn)
-        async def wraps(*args, **kwargs):
-            return await asyncio.wrap_future(self.executor.submit(spawn, fn, *args, **kwargs), loop=self.loop)
+        async def wraps(*args, profile=None, **kwargs):
+            future = self.executor.submit(share, self.dir.name, fn, *args, profile=profile, **kwargs)
+            result = await asyncio.wrap_future(future, loop=self.loop)
+            if isinstance(result, SharedArray):
+                return result.attach()
+            return result
         return wraps
 
-    async def run(self, method, *args, **kwargs):
+    async def run(self, method, *args, profile=None, **kwargs):
+        """run method in a worker process if registered, in the running loop otherwise, under profile if given
+        """
         obj = method.__self__ 
         qualname = f'{obj.__class__.__name__}.{method.__name__}'
         if qualname in self.methods:
-            return await self.methods[qualname](obj, *args, **kwargs)
-        else:
+            return await self.methods[qualname](obj, *args, profile=profile, **kwargs)
+        with profile or nullcontext():
             return await method(*args, **kwargs)
@@ -30,7 +30,7 @@ if __name__ == '__main__':
         description=description,
         long_description=readme(),
         long_description_content_type="text/x-rst",
-        packages=setuptools.find_packages(),
+        packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
         python_requires='>=3.9',
         install_requires=dep(),
     )
@@ -0,0 +1,23 @@
+import pytest
+from benchmarks.shapes import *
+from benchmarks.__main__ import measure, compare
+from genesynth.orchestration import Orchestration
+
+@pytest.mark.parametrize('shape', list(SHAPES))
+def test_shapes(shape):
+    o = Orchestration.read_dict(SHAPES[shape](10))
+    o.run()
+    assert o.root.size == 10
+
+def test_measure():
+    result = measure('foreign', 100)
+    assert result['rows'] == 100 and result['tables'] == 12
+    assert result['bytes_per_second'] > 0 and result['peak_rss'] > 0
+    assert 'TableDataModel.merge' in result['stages']
+
+def test_compare():
+    baseline = [{'shape': 'wide', 'rows': 10, 'rows_per_second': 100, 'bytes_per_second': 100, 'peak_rss': 100}]
+    results = [{'shape': 'wide', 'rows': 10, 'rows_per_second': 85, 'bytes_per_second': 70, 'peak_rss': 130},
+               {'shape': 'deep', 'rows': 10, 'rows_per_second': 1, 'bytes_per_second': 1, 'peak_rss': 1}]
+    assert compare(results, baseline, tolerance=0.2) == [('wide-10', 'bytes_per_second', 70, 100),
+                                                         ('wide-10', 'peak_rss', 130, 100)]
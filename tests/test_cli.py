@@ -1,5 +1,6 @@
 import pytest
 import os
+import json
 from pytest import fixture
 from genesynth.orchestration import *
 from genesynth.cli import *
@@ -15,3 +16,32 @@ def test_main(filename='tests/test.yaml'):
     assert os.path.isfile('tests/out')
     os.remove('tests/out')
 
+
+def test_main_shards_scratch(tmp_path):
+    scratch = tmp_path / 'scratch'
+    scratch.mkdir()
+    parts = main(['tests/test.yaml'], str(tmp_path / 'out'), shards=2, jobs=2, seed=1, scratch=str(scratch), max_disk=10 ** 9,
+                 max_memory=10 ** 9)
+    assert len(parts) == 2 and all(os.path.isfile(part) for part in parts)
+
+def test_main_incremental_scratch(tmp_path):
+    scratch = tmp_path / 'scratch'
+    scratch.mkdir()
+    main(['tests/test.yaml'], str(tmp_path / 'out'), seed=1, incremental=str(tmp_path / 'state'), scratch=str(scratch),
+         max_disk=10 ** 9, max_memory=10 ** 9)
+    assert os.path.isfile(tmp_path / 'out')
+    with pytest.raises(SystemExit):
+        main(['tests/test.yaml'], str(tmp_path / 'out'), incremental=str(tmp_path / 'state'), cache=str(tmp_path / 'cache'))
+
+def test_main_shards_report(tmp_path):
+    with pytest.raises(SystemExit):
+        main(['tests/test.yaml'], str(tmp_path / 'out'), shards=2, report=str(tmp_path / 'report.json'))
+    with pytest.raises(SystemExit):
+        main(['tests/test.yaml'], str(tmp_path / 'out'), shards=2, profile='cprofile')
+
+def test_main_stdout(tmp_path, capsys):
+    schema = tmp_path / 'zip.yaml'
+    schema.write_text("type: json\nmetadata:\n  size: 3\nproperties:\n  zip:\n    type: enum\n"
+                      "    metadata:\n      options: ['02134']\n")
+    main([str(schema)], seed=1)
+    assert [json.loads(line)['zip'] for line in capsys.readouterr().out.splitlines()] == ['02134'] * 3
@@ -0,0 +1,49 @@
+import os
+import asyncio
+import pytest
+from pytest import fixture
+import numpy as np
+import pandas as pd
+from genesynth.empirical import *
+from genesynth.types import FloatFixture, BaseTimestamp, reseed
+
+@fixture(scope='function')
+def sample(tmp_path):
+    rng = np.random.default_rng(0)
+    filename = str(tmp_path / 'sample.csv')
+    pd.DataFrame({'amount': rng.gamma(2, 10, 1000),
+                  'created': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.exponential(30, 1000), unit='D')
+                  }).to_csv(filename, index=False)
+    yield filename
+
+def test_read_sample(sample, tmp_path):
+    amount = read_sample(sample, 'amount')
+    assert amount.dtype == float and amount.size == 1000
+    assert read_sample(sample, 'created').min() >= pd.Timestamp('2024-01-01').value
+    np.save(tmp_path / 'sample.npy', amount)
+    np.testing.assert_array_equal(read_sample(str(tmp_path / 'sample.npy')), amount)
+
+@pytest.mark.parametrize('method', METHODS)
+def test_fit(sample, tmp_path, method):
+    table = fit(method, sample, 'amount', directory=str(tmp_path / 'dist'))
+    assert len(os.listdir(tmp_path / 'dist')) == 1
+    amount = read_sample(sample, 'amount')
+    median = table(np.array([0.5]))[0]
+    assert abs(median - np.median(amount)) < 0.1 * amount.std()
+    # a changed sample file is fitted again
+    pd.DataFrame({'amount': amount + 100}).to_csv(sample, index=False)
+    os.utime(sample, ns=(0, 0))
+    assert fit(method, sample, 'amount', directory=str(tmp_path / 'dist'))(np.array([0.5]))[0] > median + 50
+
+def test_fixture(sample):
+    reseed(1)
+    n = FloatFixture(name='amount', size=100)
+    n._dist = {'empirical': {'file': sample, 'column': 'amount'}}
+    arr = asyncio.run(n.generate())
+    amount = read_sample(sample, 'amount')
+    assert arr.min() >= amount.min() and arr.max() <= amount.max()
+    assert n.cache_params()[-1] == fit_key('empirical', sample, 'amount')
+    n = BaseTimestamp(name='created', size=100)
+    n._dist = {'kde': {'file': sample, 'column': 'created'}}
+    arr = asyncio.run(n.generate())
+    assert arr.dtype.kind == 'M' and arr.min() > np.datetime64('2023-12-01')
@@ -88,3 +88,43 @@ def graph():
 def test_nested(graph):
     nodes = list(set(graph))
     assert len(nodes) == 6
+
+def test_dependencies():
+    G = nx.DiGraph()
+    G.add_edge('table', 'id')
+    G.add_edge('table', 'fk')
+    G.add_edge('id', 'fk', type='fkey')
+    D = Graph(G, name='root').dependencies()
+    assert set(D.edges) == {('id', 'table'), ('fk', 'table'), ('id', 'fk')}
+    assert list(nx.topological_sort(D)) == ['id', 'fk', 'table']
+    G.add_edge('fk', 'id', type='fkey')
+    with pytest.raises(ValueError):
+        Graph(G, name='root').dependencies()
+
+def test_find_node_index():
+    G = nx.DiGraph()
+    schema_to_graph(G, 'root', load_config('tests/test.yaml'), size=10)
+    assert len(G.graph['index']) == len(G)
+    node = find_child_node(G, 'root', 'table2', 'column4')
+    assert node is G.graph['index']['root.table2.column4']
+    assert find_node(G.subgraph([node]), 'root.table1') is None
+    G.add_node(SerialFixture(name='col1', size=10))
+    assert find_node(G, 'col1').name == 'col1'
+
+def test_compile(tmp_path):
+    G = nx.DiGraph()
+    G.add_edge('table', 'id')
+    G.add_edge('table', 'fk')
+    G.add_edge('id', 'fk', type='fkey')
+    graph = Graph(G, name='root')
+    plan = graph.compile(filename=tmp_path / 'plan.json')
+    assert plan.levels == (('id',), ('fk',), ('table',))
+    assert plan.dependencies['table'] == ('fk', 'id')
+    assert plan.consumers['id'] == ('fk', 'table')
+    assert graph.compile() is plan
+    assert list(graph) == ['id', 'fk', 'table']
+    assert Plan.load(tmp_path / 'plan.json') == plan
+    with pytest.raises(TypeError):
+        plan.consumers['id'] = ()
+    G.add_edge('table', 'name')
+    assert Graph(G, name='root').compile(filename=tmp_path / 'plan.json').levels[0] == ('id', 'name')
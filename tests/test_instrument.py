@@ -0,0 +1,22 @@
+import pytest
+from genesynth.instrument import *
+from genesynth.types import reseed, SerialFixture
+
+def test_disabled():
+    instrument = Instrument()
+    node = SerialFixture(name='serial', size=10)
+    with instrument.measure(node, 'generate', 'asyncio'):
+        pass
+    assert instrument.call(node, 'generate', 'thread', sum, [1, 2]) == 3
+    assert instrument.records == []
+
+def test_measure():
+    instrument = Instrument(enabled=True)
+    node = SerialFixture(name='serial', size=10)
+    assert instrument.call(node, 'generate', 'thread', sum, [1, 2]) == 3
+    with instrument.measure(node, 'generate', 'process'):
+        pass
+    thread, process = instrument.records
+    assert thread.name == 'serial' and thread.rows == 10 and thread.cpu >= 0 and thread.bytes == 0
+    assert process.executor == 'process' and process.cpu is None
+    assert instrument.report()[0]['rows_per_second'] == 10 / thread.wall
@@ -7,6 +7,7 @@ import networkx as nx
 import numpy as np
 from genesynth.io import *
 from genesynth.orchestration import *
+from genesynth import store
 
 @fixture
 def config(): 
@@ -78,3 +79,15 @@ def test_CacheCollection_cache_array():
             
     arr = asyncio.run(Bar().generate())
     np.testing.assert_array_equal(arr, rand)
+
+def test_CacheCollection_evict(tmp_path):
+    c = CacheCollection('test', directory=str(tmp_path / 'cache'))
+    for key in ('aa01', 'bb02'):
+        store.write_column(str(tmp_path / key), np.arange(100))
+        c.put(key, str(tmp_path / key))
+        os.utime(c.path(key), (0, 0) if key == 'aa01' else (1, 1))
+    assert c.get('aa01', str(tmp_path / 'copy'))
+    np.testing.assert_array_equal(np.load(tmp_path / 'copy'), np.arange(100))
+    c.evict(1000)
+    assert 'aa01' in c and 'bb02' not in c
+    assert not c.get('bb02', str(tmp_path / 'miss'))
@@ -32,3 +32,22 @@ def test_ordered_index(arr):
 def test_revert_ordered_index(arr):
     idx = revert_ordered_index(arr)
     np.testing.assert_array_equal(idx, [3, 7, 8, 4, 0, 1, 2, 6, 5, 9])
+
+@pytest.mark.parametrize('model,kwargs,low,high', [
+    ('gamma', {'a': 2}, 0, 20),
+    ('beta', {'a': 2, 'b': 5}, 0, 1),
+    ('student_t', {'df': 3}, -50, 50),
+    ('poisson', {'mu': 3}, 0, 10),
+])
+def test_stats_model_generate_table(model, kwargs, low, high):
+    exact = stats_model_generate(1000, low, high, model=model, rng=np.random.default_rng(0), accuracy=0, **kwargs)
+    table = stats_model_generate(1000, low, high, model=model, rng=np.random.default_rng(0), **kwargs)
+    np.testing.assert_allclose(table, exact, atol=ACCURACY * (high - low))
+    ordered = stats_model_generate(100, low, high, model=model, unique=True, **kwargs)
+    assert (np.diff(ordered) >= 0).all() and ordered[0] >= low and ordered[-1] <= high
+
+def test_inverse_cdf_table():
+    coarse = inverse_cdf_table('gamma', 0, 20, (), (('a', 2),), 1e-3)
+    assert coarse is inverse_cdf_table('gamma', 0, 20, (), (('a', 2),), 1e-3)
+    assert len(coarse.grid) < len(inverse_cdf_table('gamma', 0, 20, (), (('a', 2),), ACCURACY).grid)
+    np.testing.assert_allclose(coarse(np.array([0., 1.])), [0, 20])
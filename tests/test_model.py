@@ -3,6 +3,7 @@ from pytest import fixture
 import gzip
 import asyncio
 from genesynth.model import *
+from genesynth.store import Column
 
 @fixture(scope='function')
 def params():
@@ -15,31 +16,31 @@ def params():
 def test_integer(params):
     n = IntegerFixture(min=0, max=100, **params)
     #arr = np.array([37, 12, 72, 9, 75, 5, 79, 64, 16, 1]).astype(str)
-    arr = np.array([41, 72, 0, 30, 14, 9, 18, 34, 39, 53]).astype(str)
+    arr = np.array([98, 97, 54, 87, 2, 87, 79, 51, 48, 20])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_serial(params):
     n = SerialFixture(min=0, step=2, **params)
-    arr = np.array([0, 2, 4, 6, 8, 10, 12, 14, 16, 18]).astype(str)
+    arr = np.array([0, 2, 4, 6, 8, 10, 12, 14, 16, 18])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_boolean(params):
     n = BooleanFixture(**params)
-    arr = np.array(['true', 'true', 'false', 'false', 'true', 'true', 'true', 'true', 'true', 'false'])
+    arr = np.array([False, False, False, False, True, False, False, False, True, True])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_float(params):
     n = FloatFixture(min=0, max=10, **params)
     #arr = np.array([4.170220, 7.203245, 0.001143748, 3.023326, 1.467559, 0.9233859, 1.862602, 3.455607, 3.967675, 5.388167]).astype(str)
-    arr = np.array(['4.17022004702574', '7.203244934421581', '0.0011437481734488664',
-                '3.0233257263183977', '1.4675589081711304', '0.923385947687978',
-                '1.862602113776709', '3.4556072704304777', '3.9676747423066994',
-                '5.3881673400335695'])
+    arr = np.array(['9.883562482926674', '9.729942913116753', '5.462646725351002',
+                '8.724813606172432', '0.2104996893920319', '8.765610124693039',
+                '7.9369174341665785', '5.1854773430336625', '4.89454972164577',
+                '2.03355409188629']).astype(float)
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_decimal(params):
     n = DecimalFixture(min=0, max=10, precision=0, scale=5, **params)
-    arr = np.array([4.17022, 7.20324, 0.00114, 3.02333, 1.46756, 0.92339, 1.8626, 3.45561, 3.96767, 5.38817]).astype(str)
+    arr = np.array([9.88356, 9.72994, 5.46265, 8.72481, 0.2105, 8.76561, 7.93692, 5.18548, 4.89455, 2.03355])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_map(params):
@@ -51,7 +52,7 @@ def test_map(params):
     records = asyncio.run(n.generate())
     assert len(records) == len(children)
     assert set(records) == {'id', 'value'}
-    np.testing.assert_array_equal(records['id'], np.arange(10).astype(str))
+    np.testing.assert_array_equal(records['id'], np.arange(10))
 
 def test_array(params):
     children = [
@@ -61,7 +62,7 @@ def test_array(params):
     n = BaseArrayFixture(children=children, **params)
     records = asyncio.run(n.generate())
     assert len(records) == len(children)
-    np.testing.assert_array_equal(records[0], np.arange(10).astype(str))
+    np.testing.assert_array_equal(records[0], np.arange(10))
 
 def test_nest(params):
     fields = {
@@ -74,10 +75,10 @@ def test_nest(params):
     n = BaseMapFixture(children=children, **params)
     records = asyncio.run(n.generate())
     assert set(records) == {'id', 'json'}
-    np.testing.assert_array_equal(records['id'], np.arange(10).astype(str))
+    np.testing.assert_array_equal(records['id'], np.arange(10))
     assert set(records['json']) == {'value'}
     #np.testing.assert_array_equal(records['json']['value'], np.array([5, 8, 9, 5, 0, 0, 1, 7, 6, 9]).astype(str))
-    np.testing.assert_array_equal(records['json']['value'], np.array([4, 6, 2, 8, 0, 6, 4, 5, 1, 1]).astype(str))
+    np.testing.assert_array_equal(records['json']['value'], np.array([7, 8, 3, 4, 8, 8, 9, 6, 6, 4]))
 
 def test_write(params):
     fields = {
@@ -95,7 +96,7 @@ def test_write(params):
     asyncio.run(n.save('foo'))
     with open('foo') as fh:
         assert fh.readline().rstrip('\n') == 'id,json,text'
-        assert fh.readline().rstrip('\n') == '0,{"value": "4"},carol'
+        assert fh.readline().rstrip('\n') == '0,{"value": 7},neil'
     os.remove('foo')
 
 def test_nested_write(params):
@@ -117,5 +118,98 @@ def test_nested_write(params):
     asyncio.run(n.save('foo.gz'))
     with gzip.open('foo.gz', 'rt') as fh:
         assert fh.readline().rstrip('\n') == 'id,json,text'
-        assert fh.readline().rstrip('\n') == '0,{"map": {"value": "4"}},carol'
+        assert fh.readline().rstrip('\n') == '0,{"map": {"value": 7}},neil'
     os.remove('foo.gz')
+
+def test_merge_blocks(params, tmp_path):
+    children = {
+        'id': SerialFixture(name='id', size=params['size'], min=0, step=1),
+        'value': FloatFixture(name='value', size=params['size'], min=0, max=10),
+        'word': StringFixture(name='text', field='word', size=params['size'])
+    }
+    n = TableDataModel(children=children, **params)
+    n.sep = b','
+    asyncio.run(n.write())
+    with open(n._file, 'rb') as fh:
+        expected = fh.read()
+    asyncio.run(n.merge(list(children.values()), path=str(tmp_path), chunk_size=3))
+    with open(os.path.join(tmp_path, n.name), 'rb') as fh:
+        assert fh.read() == expected
+    assert expected.count(b'\n') == params['size']
+
+def test_json_lines(params, tmp_path):
+    fields = {
+        'value': FloatFixture(name='value', size=params['size'], min=0, max=10),
+        'flag': BooleanFixture(name='flag', size=params['size']),
+        'word': StringFixture(name='text', field='word', size=params['size']),
+        'day': BaseDate(name='day', size=params['size']),
+    }
+    fields['value']._constraints = {'nullable': [50]}
+    n = JsonArrayDataModel(children=fields, **params)
+    asyncio.run(n.write())
+    nodes = list(fields.values())
+    columns = [Column(node._file) for node in nodes]
+    values = [node.tolist(column[:]) for node, column in zip(nodes, columns)]
+    expected = [json.dumps([dict(zip(['value', 'flag', 'text', 'day'], row))]) for row in zip(*values)]
+    with open(n._file) as fh:
+        assert fh.read().splitlines() == expected
+    assert None in values[0]
+    asyncio.run(n.merge(nodes, path=str(tmp_path), chunk_size=3))
+    with open(os.path.join(tmp_path, n.name)) as fh:
+        assert fh.read().splitlines() == expected
+
+def test_json_types(params):
+    enum = types['enum']
+    fields = {
+        'number': enum(name='root.number', size=params['size'], options=(3, 4.5)),
+        'flag': enum(name='root.flag', size=params['size'], options=(True, False)),
+        'zip': enum(name='root.zip', size=params['size'], options=('02134', '10001')),
+        'ts': BaseTimestamp(name='root.ts', size=params['size'], min=datetime(2020, 1, 1), max=datetime(2030, 1, 1), posix=True),
+    }
+    n = JsonDataModel(name='root', children=fields, size=params['size'])
+    asyncio.run(n.write())
+    with open(n._file) as fh:
+        rows = [json.loads(line) for line in fh]
+    assert len(rows) == params['size']
+    assert all(row['number'] in (3, 4.5) and not isinstance(row['number'], str) for row in rows)
+    assert all(isinstance(row['flag'], bool) for row in rows)
+    assert all(row['zip'] in ('02134', '10001') for row in rows)
+    assert all(isinstance(row['ts'], float) for row in rows)
+    assert rows[0]['ts'] == datetime(2020, 1, 1).timestamp()
+    column = Column(fields['number']._file)
+    assert set(fields['number'].tolist(column[:])) <= {3, 4.5}
+
+def test_correlation(params):
+    size = 3 * CHUNK_SIZE // 2
+    children = {
+        'price': FloatFixture(name='root.price', size=size, min=0, max=100),
+        'quantity': IntegerFixture(name='root.quantity', size=size, min=0, max=50),
+        'flag': BooleanFixture(name='root.flag', size=size),
+    }
+    children['price']._dist = {'gamma': {'a': 2, 'scale': 10}}
+    metadata = {'correlation': {'columns': ['price', 'quantity'], 'matrix': [[1, -0.8], [-0.8, 1]]}}
+    n = JsonDataModel(name='root', size=size, children=children, metadata=metadata)
+    n.stage()
+    price, quantity = (children[name].rows(0, size) for name in ('price', 'quantity'))
+    assert stats.spearmanr(price, quantity)[0] < -0.7
+    assert abs(stats.spearmanr(price, children['flag'].rows(0, size))[0]) < 0.05
+    assert quantity.min() >= 0 and quantity.max() <= 50
+    # any row range of a column is drawn on its own
+    np.testing.assert_array_equal(children['price'].rows(CHUNK_SIZE - 5, CHUNK_SIZE + 5), price[CHUNK_SIZE - 5:CHUNK_SIZE + 5])
+
+def test_correlation_matrix(params):
+    children = {'a': FloatFixture(name='root.a', size=10), 'b': FloatFixture(name='root.b', size=10)}
+    n = TableDataModel(name='root', size=10, children=children, metadata={'correlation': {'columns': ['a', 'b'], 'matrix': [[1, 2], [2, 1]]}})
+    with pytest.raises(AssertionError):
+        n.stage()
+
+def test_correlation_string(params):
+    children = {'a': FloatFixture(name='root.a', size=10), 'b': StringFixture(name='root.b', size=10)}
+    metadata = {'correlation': {'columns': ['a', 'b'], 'matrix': [[1, 0.5], [0.5, 1]]}}
+    n = TableDataModel(name='root', size=10, children=children, metadata=metadata)
+    with pytest.raises(AssertionError, match='can not be correlated'):
+        n.stage()
+    children['b'] = StringFixture(name='root.b', size=10, pool=5)
+    n = TableDataModel(name='root', size=10, children=children, metadata=metadata)
+    n.stage()
+    assert len(set(children['b'].rows(0, 10))) <= 5
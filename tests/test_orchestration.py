@@ -1,11 +1,18 @@
+import gzip
 import pytest
+import os
+import json
+import random
+import functools
+import multiprocessing
+from concurrent import futures
 from pytest import fixture
 import asyncio
 from dataclasses import dataclass
 import networkx as nx
 import numpy as np
 from genesynth.orchestration import *
-from genesynth.worker import Runner
+from genesynth.worker import Runner, PoolManager
 from genesynth.types import reseed, worker, SerialFixture, StringFixture
 
 @fixture
@@ -27,23 +34,148 @@ def o():
 @pytest.mark.asyncio
 async def test_process(o, node):
     arr = await o.process(node)
-    np.testing.assert_array_equal(arr, np.arange(10).astype(str))
+    np.testing.assert_array_equal(arr, np.arange(10))
 
 @pytest.mark.asyncio
 async def test_worker_process(o, string):
     arr = await o.process(string)
-    np.testing.assert_array_equal(arr, ['carol', 'square', 'returned', 'diary', 'lab', 'indicators', 'patterns', 'scenes', 'bi', 'alerts'])
+    np.testing.assert_array_equal(arr, ['neil', 'test', 'missouri', 'conditions', 'relations', 'begins', 'kg', 'ftp', 'raising', 'replacement'])
 
 @pytest.mark.asyncio
 async def test_thread(o, node):
     arr = await o.thread(node)
-    np.testing.assert_array_equal(arr, np.arange(10).astype(str))
+    np.testing.assert_array_equal(arr, np.arange(10))
 
 @pytest.mark.asyncio
 async def test_asyncio(o, node):
     arr = await o.asyncio(node)
-    np.testing.assert_array_equal(arr, np.arange(10).astype(str))
+    np.testing.assert_array_equal(arr, np.arange(10))
+
+def test_thread_pool():
+    manager = PoolManager(processes=1, threads=10)
+    o = Orchestration(nx.DiGraph(), thread=3, runner=Runner(registry=worker, pools=manager))
+    assert o.limits[WorkloadType.IO] == 3 and o.executor._max_workers == 3
+    o = Orchestration(nx.DiGraph(), runner=Runner(registry=worker, pools=manager))
+    assert o.limits[WorkloadType.IO] == 3
+    manager.shutdown()
 
 def test_orchestration_read_config():
     o = Orchestration.read_config('tests/test.yaml')
     assert len(o.graph.nodes) == 7
+
+def test_schedule():
+    o = Orchestration.read_config('tests/test.yaml', limits={WorkloadType.IO: 2})
+    asyncio.run(o.schedule())
+    assert set(o.timings) == set(o.graph.nodes)
+    for before, after in o.dag.edges:
+        assert o.timings[before][1] <= o.timings[after][0]
+    fkey = o.graph.find_node('root.table2.column4')
+    assert (o.graph.find_node('root.table1.column1'), fkey) in o.dag.edges
+    path, duration = o.critical_path()
+    assert path[-1] is o.root
+    assert 0 < duration <= o.wall_time
+    with open(o.root._file) as fh:
+        assert len(fh.readlines()) == 20
+
+def test_run_shards(tmp_path):
+    config = load_configs('tests/e_commerce.yaml')
+    reseed(7)
+    root = run(config)
+    with open(root._file, 'rb') as fh:
+        expected = fh.read()
+    filename = run_shards(config, str(tmp_path / 'out'), 3, jobs=2, seed=7, concat=True)
+    with open(filename, 'rb') as fh:
+        assert fh.read() == expected
+    assert os.listdir(tmp_path) == ['out']
+
+def test_run_shards_gzip(tmp_path):
+    config = load_configs('tests/test.yaml')
+    reseed(7)
+    root = run(config)
+    with open(root._file, 'rb') as fh:
+        expected = fh.read()
+    parts = run_shards(config, str(tmp_path / 'out.gz'), 2, jobs=2, seed=7)
+    assert [os.path.basename(part) for part in parts] == ['out.part-00000.gz', 'out.part-00001.gz']
+    filename = concat_files(parts, str(tmp_path / 'out.gz'), remove=True)
+    with gzip.open(filename, 'rb') as fh:
+        assert fh.read() == expected
+
+def test_run_shards_spawn(tmp_path, monkeypatch):
+    config = load_configs('tests/test.yaml')
+    reseed(7)
+    root = run(config)
+    with open(root._file, 'rb') as fh:
+        expected = fh.read()
+    # workers started by spawn do not inherit the entropy of this process, only the seed drawn once for every shard
+    spawn = multiprocessing.get_context('spawn')
+    monkeypatch.setattr(futures, 'ProcessPoolExecutor', functools.partial(futures.ProcessPoolExecutor, mp_context=spawn))
+    monkeypatch.setattr(random.SystemRandom, 'randrange', lambda self, n: 7)
+    reseed()
+    filename = run_shards(config, str(tmp_path / 'out'), 2, jobs=2, concat=True)
+    with open(filename, 'rb') as fh:
+        assert fh.read() == expected
+
+def test_cache(tmp_path):
+    cache = CacheCollection('test', directory=str(tmp_path))
+    outputs = []
+    for _ in range(2):
+        reseed(5)
+        o = Orchestration.read_config('tests/test.yaml', cache=cache)
+        o.run()
+        with open(o.root._file, 'rb') as fh:
+            outputs.append(fh.read())
+    assert outputs[0] == outputs[1]
+    assert set(o.timings) == {o.root}
+    assert o.root.cache_key() in cache
+
+def test_run_incremental(tmp_path):
+    config = load_configs('tests/test.yaml')
+    first = run_incremental(config, str(tmp_path), seed=5)
+    assert set(first.timings) == set(first.dag.nodes)
+    config['properties']['table2']['properties']['column3']['metadata']['max'] = 100
+    o = run_incremental(config, str(tmp_path))
+    assert {n.name for n in o.timings if n not in o.hits} == {'root', 'root.table2', 'root.table2.column3'}
+    assert o.diff(first.manifest()) == {'root', 'root.table2', 'root.table2.column3'}
+    with open(first.root._file) as a, open(o.root._file) as b:
+        for old, new in zip(a, b):
+            assert json.loads(old)['table1'] == json.loads(new)['table1']
+            assert json.loads(new)['table2']['column3'] <= 100
+
+def test_disk_budget(tmp_path):
+    o = Orchestration.read_config('tests/test.yaml', scratch=str(tmp_path), max_disk=1)
+    o.run()
+    assert o.root._file.startswith(str(tmp_path))
+    assert all(node._file is None for node in o.timings if node is not o.root)
+    assert list(o.disk) == [o.root]
+    timings = sorted(o.timings.values())
+    assert all(stop <= start for (_, stop), (start, _) in zip(timings, timings[1:]))
+
+def test_memory_budget():
+    o = Orchestration.read_config('tests/test.yaml', max_memory=1)
+    assert not o.admit(o.root, [])
+    o.run()
+    timings = sorted(o.timings.values())
+    assert all(stop <= start for (_, stop), (start, _) in zip(timings, timings[1:]))
+    assert all(node._mask is None for node in o.timings)
+
+def test_report():
+    o = Orchestration.read_config('tests/test.yaml', instrument=Instrument(enabled=True))
+    o.run()
+    report = o.report()
+    assert report['critical_path'][-1] == 'root'
+    stages = {(record['name'], record['stage'], record['executor']) for record in report['records']}
+    assert ('root.table1.column2', 'write', 'thread') in stages
+    assert ('root', 'merge', 'asyncio') in stages
+    assert all(record['bytes'] > 0 for record in report['records'])
+
+@pytest.mark.parametrize('kind', ['cprofile', 'tracemalloc'])
+def test_profile(tmp_path, kind):
+    profiler = Profiler(kind, directory=str(tmp_path))
+    o = Orchestration.read_config('tests/test.yaml', profiler=profiler)
+    o.run()
+    stages = {(name, stage) for name, stage, _ in profiler.stats()}
+    assert ('root.table1.column2', 'write') in stages
+    assert ('root', 'merge') in stages
+    with open(profiler.save(str(tmp_path / 'report.txt'))) as fh:
+        assert fh.readline() == 'run\n'
+        assert 'root merge' in fh.read()
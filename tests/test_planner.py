@@ -0,0 +1,54 @@
+import io
+import pytest
+from genesynth.io import load_configs, resize
+from genesynth.planner import *
+
+def test_resize():
+    config = resize(load_configs('tests/e_commerce.yaml'), 5, cap=True)
+    assert config['metadata']['size'] == 5
+    assert config['properties']['user']['metadata']['size'] == 5
+    assert load_configs('tests/e_commerce.yaml')['properties']['user']['metadata']['size'] == 20
+    assert resize(load_configs('tests/e_commerce.yaml'), 50)['metadata']['size'] == 50
+    assert resize(load_configs('tests/e_commerce.yaml'), 50, cap=True)['metadata']['size'] == 20
+
+def test_estimate():
+    estimates, tables = estimate(load_configs('tests/test.yaml'), sample=5)
+    assert [e.name for e in estimates][-1] == 'root'
+    assert all(e.rows == 20 and e.seconds > 0 for e in estimates)
+    root = tables[-1]
+    assert root.disk == sum(e.disk for e in estimates)
+    assert root.seconds == pytest.approx(sum(e.seconds for e in estimates))
+    fh = io.StringIO()
+    report(estimates, tables, fh=fh)
+    assert 'root.table2.column4' in fh.getvalue()
+
+def test_tables():
+    config = load_configs('tests/e_commerce.yaml')
+    estimates, tables = estimate(config, sample=5)
+    by_name = {e.name: e for e in estimates}
+    user = next(t for t in tables if t.name == 'root.user')
+    # foreign keys referencing user.id are charged to their own table
+    columns = [e for name, e in by_name.items() if name.startswith('root.user.')]
+    assert user.disk == sum(e.disk for e in columns) + by_name['root.user'].disk
+    assert 'root.order.user_id' in by_name
+
+def test_calibrate():
+    rates = calibrate(load_configs('tests/e_commerce.yaml'), sample=5)
+    assert ('StringFixture', 'text', 'sentence') in rates and ('TableDataModel', None, None) in rates
+    assert all(rate > 0 for rate in rates.values())
+
+def test_assumed_rate():
+    config = {'type': 'table', 'metadata': {'size': 20}, 'properties': {
+        'id': {'type': 'serial'},
+        'title': {'type': 'ollama', 'metadata': {'prompt': 'title', 'model': 'none'}},
+        'summary': {'type': 'openai', 'metadata': {'prompt': 'summary', 'rate': 0.5}}}}
+    # no completion request is made, there is no server to answer it
+    estimates, tables = estimate(config, sample=5)
+    by_name = {e.name: e for e in estimates}
+    assert by_name['root.title'].assumed and by_name['root.title'].seconds == 20.0
+    assert by_name['root.summary'].assumed and by_name['root.summary'].seconds == 10.0
+    assert not by_name['root.id'].assumed and by_name['root.id'].seconds > 0
+    assert tables[-1].assumed
+    fh = io.StringIO()
+    report(estimates, tables, fh=fh)
+    assert '20.000*' in fh.getvalue() and 'assumed' in fh.getvalue()
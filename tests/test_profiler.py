@@ -0,0 +1,36 @@
+import os
+import pickle
+import tracemalloc
+import pytest
+from genesynth.profiler import *
+from genesynth.types import SerialFixture
+
+def test_profiled(tmp_path):
+    filename = str(tmp_path / 'sum.cprofile')
+    profiled = Profiled('cprofile', filename)
+    assert profiled(sum, [1, 2]) == 3
+    assert os.path.isfile(filename)
+    assert pickle.loads(pickle.dumps(profiled)).filename == filename
+
+def test_save(tmp_path):
+    profiler = Profiler('cprofile', directory=str(tmp_path))
+    node = SerialFixture(name='serial', size=10)
+    with profiled(profiler, node, 'generate'):
+        sorted(range(1000))
+    with profiled(None, node, 'write'):
+        pass
+    filename = profiler.save(str(tmp_path / 'report.txt'))
+    assert os.path.isfile(filename + '.prof')
+    with open(filename) as fh:
+        text = fh.read()
+    assert 'serial generate' in text and 'serial write' not in text
+
+def test_tracemalloc(tmp_path):
+    profiler = Profiler('tracemalloc', directory=str(tmp_path))
+    node = SerialFixture(name='serial', size=10)
+    with profiler.profile(node, 'generate'):
+        data = [bytes(1000) for _ in range(100)]
+    (name, stage, stats), = profiler.stats()
+    assert name == 'serial' and sum(stat['size'] for stat in stats) > 0
+    profiler.save(str(tmp_path / 'report.txt'))
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,60 @@
+import pytest
+from pytest import fixture
+import os
+import tempfile
+import numpy as np
+from genesynth.store import *
+
+@fixture
+def path():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield tmp
+
+def test_fixed_column(path):
+    filename = write_column(os.path.join(path, 'col'), np.arange(10))
+    assert not os.path.isfile(filename + OFFSETS)
+    column = Column(filename)
+    assert len(column) == 10
+    np.testing.assert_array_equal(column[2:5], [2, 3, 4])
+    assert column.lines(0, 3) == [b'0', b'1', b'2']
+
+def test_varlen_column(path):
+    arr = np.array(['a', 'bb', '', 'ünï', 'line\nbreak'])
+    filename = write_column(os.path.join(path, 'col'), arr)
+    column = Column(filename)
+    assert column.varlen
+    np.testing.assert_array_equal(column[0:5], arr)
+    assert column.lines(1, 4) == [b'bb', b'', 'ünï'.encode('utf-8')]
+
+def test_chunked_masked_column(path):
+    filename = os.path.join(path, 'col')
+    with ColumnWriter(filename, 6) as writer:
+        writer.write(np.ma.MaskedArray(np.array(['a', 'b', 'c']), mask=[False, True, False]))
+        writer.write(np.array(['d', 'e', 'f']))
+    column = Column(filename)
+    np.testing.assert_array_equal(column[0:6].mask, [False, True, False, False, False, False])
+    assert column.lines(0, 4) == [b'a', b'', b'c', b'd']
+    remove(filename)
+    assert os.listdir(path) == []
+
+@pytest.mark.parametrize('arr', [np.arange(3), np.ma.MaskedArray(np.array(['a', 'b', 'c']), mask=[False, True, False])])
+def test_column_writer_error(path, arr):
+    filename = os.path.join(path, 'col')
+    # the error raised while writing surfaces instead of the row count check, and the partial column is removed
+    with pytest.raises(ValueError, match='generate failed'):
+        with ColumnWriter(filename, 6) as writer:
+            writer.write(arr)
+            raise ValueError('generate failed')
+    assert os.listdir(path) == []
+
+def test_line_writer(path):
+    filename = os.path.join(path, 'table')
+    with open(filename, 'wb') as fh:
+        fh.write(b'id,name\n')
+        writer = LineWriter(fh, filename, 3)
+        writer.write([b'0,a', b'1,b'])
+        writer.write([b'2,c'])
+        writer.close()
+    column = Column(filename)
+    assert column.lines(1, 3) == [b'1,b', b'2,c']
+    assert list(iterate_lines(column, column, chunk_size=2))[2] == (b'2,c', b'2,c')
@@ -15,71 +15,106 @@ def params():
 def test_integer(params):
     n = IntegerFixture(min=0, max=100, **params)
     #arr = np.array([37, 12, 72, 9, 75, 5, 79, 64, 16, 1]).astype(str)
-    arr = np.array([41, 72, 0, 30, 14, 9, 18, 34, 39, 53]).astype(str)
+    arr = np.array([98, 97, 54, 87, 2, 87, 79, 51, 48, 20])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_serial(params):
     n = SerialFixture(min=0, step=2, **params)
-    arr = np.array([0, 2, 4, 6, 8, 10, 12, 14, 16, 18]).astype(str)
+    arr = np.array([0, 2, 4, 6, 8, 10, 12, 14, 16, 18])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_boolean(params):
     n = BooleanFixture(**params)
-    arr = np.array(['true', 'true', 'false', 'false', 'true', 'true', 'true', 'true', 'true', 'false'])
+    arr = np.array([False, False, False, False, True, False, False, False, True, True])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_float(params):
     n = FloatFixture(min=0, max=10, **params)
     #arr = np.array([4.170220, 7.203245, 0.001143748, 3.023326, 1.467559, 0.9233859, 1.862602, 3.455607, 3.967675, 5.388167]).astype(str)
-    arr = np.array(['4.17022004702574', '7.203244934421581', '0.0011437481734488664',
-                '3.0233257263183977', '1.4675589081711304', '0.923385947687978',
-                '1.862602113776709', '3.4556072704304777', '3.9676747423066994',
-                '5.3881673400335695'])
+    arr = np.array(['9.883562482926674', '9.729942913116753', '5.462646725351002',
+                '8.724813606172432', '0.2104996893920319', '8.765610124693039',
+                '7.9369174341665785', '5.1854773430336625', '4.89454972164577',
+                '2.03355409188629']).astype(float)
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_decimal(params):
     n = DecimalFixture(min=0, max=10, precision=0, scale=5, **params)
-    arr = np.array([4.17022, 7.20324, 0.00114, 3.02333, 1.46756, 0.92339, 1.8626, 3.45561, 3.96767, 5.38817]).astype(str)
+    arr = np.array([9.88356, 9.72994, 5.46265, 8.72481, 0.2105, 8.76561, 7.93692, 5.18548, 4.89455, 2.03355])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
+def test_nullable(params):
+    n = IntegerFixture(min=0, max=100, **params)
+    n._constraints = {'nullable': [50]}
+    arr = asyncio.run(n.generate())
+    assert arr.dtype == np.int64
+    assert arr.mask.any()
+    assert list(n.format(arr)[arr.mask]) == [''] * arr.mask.sum()
+    assert n.tolist(arr)[np.flatnonzero(arr.mask)[0]] is None
+
 def test_text(params):
     n = BaseTextFixture(length=5, **params)
-    arr = np.array(['JXdhV', '5z45g', 'OLTx1', 'DbxAl', 'ecikH', 'AhkoU', 'msHd1', 'spUal', 'kFqgK', '7MvZh'])
+    arr = np.array(['QPsW5', 'q3vIX', 'phWAz', 'A5oU4', 'LmDHV', 'gBdJt', 'oHc88', 'GgKlM', 'DngVC', 'CJml0'])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_string(params):
     n = StringFixture(subtype='person', field='first_name', **params)
-    arr = np.array(['Walter', 'Hershel', 'Rudolf', 'Shirl', 'Jackeline', 'Ron', 'Martin', 'Afton', 'Keren', 'Zackary'])
+    arr = np.array(['Lauran', 'Neomi', 'Dorian', 'Lavera', 'Micheline', 'Ignacia', 'Roderick', 'Loma', 'Clemencia', 'Donald'])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
+def test_string_pool(params):
+    n = StringFixture(subtype='person', field='first_name', pool=5, **params)
+    arr = asyncio.run(n.generate())
+    assert arr.size == params['size']
+    pool = string_pool(n.subtype, n.field, locale=n.locale, length=n.length, seed=n.seed)
+    assert set(arr) <= set(pool.array)
+    assert np.unique(arr).size <= 5
+
+def test_string_pool_shared(params):
+    small = StringFixture(subtype='person', field='first_name', pool=5, name='small', size=200)
+    big = StringFixture(subtype='person', field='first_name', pool=200, name='big', size=200)
+    string_pool.cache_clear()
+    expected = asyncio.run(small.generate())
+    # a bigger pool grown first by another fixture with the same provider does not change the column
+    string_pool.cache_clear()
+    asyncio.run(big.generate())
+    arr = asyncio.run(small.generate())
+    np.testing.assert_array_equal(arr, expected)
+    assert np.unique(arr).size <= 5
+
+def test_string_pool_unique(params):
+    n = StringFixture(subtype='person', field='first_name', pool=2, **params)
+    n._constraints = {'unique': []}
+    arr = asyncio.run(n.generate())
+    assert np.unique(arr).size == params['size']
+
 def test_password(params):
     n = BcryptPassword(**params)
-    arr = np.array(['$2b$12$i0VpEBOWfbZAVaBSo63bbH6xnAbnBEoonCrbZINl91huSS6AZPsK2',
-                    '$2b$12$0FKcpXzkIRPxBFWGyEbcR8KykF8VH1oF7JCqH7aWY2TYGIAd1JmFE',
-                    '$2b$12$wvHMLCbokK1XXYp0PfbaUpgMvejGkqSCtDbxAlg3FmLYbbjSjRQHn',
-                    '$2b$12$8XGnOyJtNds82s1t6Uzpa2cY7Jk18RFxvmPAmgPsEu23bmu9WvnPZ',
-                    '$2b$12$5v2QE9oSfk4nVL0wvs1L73iIgce1WZvMWxJnfq3I5CrWZaPfh2co9',
-                    '$2b$12$AhkoUg4x84spDgOca8sKBtd488gnM8HQPqHtpfr8BON6ytut03suH',
-                    '$2b$12$JKpbpeIeeNsXE1jFXe6kW9YtgF5s3i4bt3X40UQlAjSPpd7YIH0Cy',
-                    '$2b$12$upbOzJdwihqZyyLoaGFOBQToEDnzI44rOceF2jV2tQ0xRTK137Jkp',
-                    '$2b$12$nJUdQSvFkTc8YMq47iW0ORB58xXAkuh47hLzhspUalBbMLZmrHqKp',
-                    '$2b$12$QXY8HE1VJxrgYhUH7V8iFJtFwGaBBsyWQEOxmarL2ZF9CZzU9skMG'])
+    arr = np.array(['$2b$12$wNVqV0yjGqZB5ZQEpSO5E6qKl9Tjj1okalodh7LBrCcSyGWGYYiFJ',
+                    '$2b$12$Rl7hSvP7Tmq3vIXiGGpQjMhwtnwsnsdvZTttdmhIavk8rXKC24WCA',
+                    '$2b$12$bb6ZkCjNn4HvD4ogduSllcPg5JR5TLxFH8W7XyVLn08bjH3GjMWnu',
+                    '$2b$12$MHf7oom16SroVxYTYCCGS1jPFlcMykmUDgJexLEU0fEKIS7HNbqSR',
+                    '$2b$12$xTSbvmqzmb7ZvC7kA5oU4xuWfF5UwpcTthtNTGu34YWIcslJmQNEh',
+                    '$2b$12$50kl9hyJ5BEwjkybbUZ09OF5hJhe1AUAFq1LUtFRbg6VeU6Uf6oEi',
+                    '$2b$12$BHnj3PifGJXbtzTzL9AhEMafcoKxGS8uWod2nFc4x6wMBLGczcFgB',
+                    '$2b$12$dJtS2k23CNmDg3AqQZwLhWcfXXYa7u2TdZk3EJb4whh4yRfFKsP7r',
+                    '$2b$12$aeGReR8Ncx9LT9zsTd3fQ0DjKgwS5spNE7FT5Xq6C1IyeC0KH3iR0',
+                    '$2b$12$9nOCH5jWaN4PQYPL1OcSDSztyQmvzDIlZwGEhupPYKwuuTkMiKfeW'])
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
 
 def test_timestamp(params):
     n = BaseTimestamp(min='2020-01-01', max='2020-01-10', **params)
     arr = np.array([datetime(2020,1,1), datetime(2020,1,2), datetime(2020,1,3), datetime(2020,1,4), datetime(2020,1,5), datetime(2020,1,6), datetime(2020,1,7), datetime(2020,1,8), datetime(2020,1,9), datetime(2020,1,10)]).astype(str)
-    np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
+    np.testing.assert_array_equal(n.format(asyncio.run(n.generate())), arr)
 
 def test_date(params):
     n = BaseDate(min='2020-01-01', max='2020-01-10', **params)
     arr = np.array([date(2020,1,1), date(2020,1,2), date(2020,1,3), date(2020,1,4), date(2020,1,5), date(2020,1,6), date(2020,1,7), date(2020,1,8), date(2020,1,9), date(2020,1,10)]).astype(str)
-    np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
+    np.testing.assert_array_equal(n.format(asyncio.run(n.generate())), arr)
 
 def test_time(params):
     n = BaseTime(min=time(0), max=time(23, 59, 59), **params)
     arr = np.array([time(0), time(2, 39, 59, 888888), time(5, 19, 59, 777777), time(7, 59, 59, 666666), time(10, 39, 59, 555555), time(13, 19, 59, 444444), time(15, 59, 59, 333333), time(18, 39, 59, 222222), time(21, 19, 59, 111111), time(23, 59, 59)]).astype(str)
-    np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
+    np.testing.assert_array_equal(n.format(asyncio.run(n.generate())), arr)
 
 def test_foreign(params):
     parent = IntegerFixture(min=0, max=100, name='parent', size=params['size'])
@@ -88,8 +123,12 @@ def test_foreign(params):
     G.add_edge(parent, child)
     n = BaseForeign.from_params(graph=G, depends_on='parent.child', **params)
     #arr = np.array([37, 12, 72, 9, 75, 5, 79, 64, 16, 1]).astype(str)
-    arr = np.array([41, 72, 0, 30, 14, 9, 18, 34, 39, 53]).astype(str)
+    arr = np.array([3, 28, 53, 60, 73, 14, 57, 20, 30, 76])
+    np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
+    # the referenced column is generated once and read back afterwards
+    filename = child._file
     np.testing.assert_array_equal(asyncio.run(n.generate()), arr)
+    assert child._file == filename and child.artifacts[child].filename == filename
 
 def test_map(params):
     children = {
@@ -100,7 +139,7 @@ def test_map(params):
     records = asyncio.run(n.generate())
     assert len(records) == len(children)
     assert set(records) == {'id', 'value'}
-    np.testing.assert_array_equal(records['id'], np.arange(10).astype(str))
+    np.testing.assert_array_equal(records['id'], np.arange(10))
 
 def test_array(params):
     children = [
@@ -110,7 +149,7 @@ def test_array(params):
     n = BaseArrayFixture(children=children, **params)
     records = asyncio.run(n.generate())
     assert len(records) == len(children)
-    np.testing.assert_array_equal(records[0], np.arange(10).astype(str))
+    np.testing.assert_array_equal(records[0], np.arange(10))
 
 def test_nest(params):
     fields = {
@@ -123,7 +162,99 @@ def test_nest(params):
     n = BaseMapFixture(children=children, **params)
     records = asyncio.run(n.generate())
     assert set(records) == {'id', 'json'}
-    np.testing.assert_array_equal(records['id'], np.arange(10).astype(str))
+    np.testing.assert_array_equal(records['id'], np.arange(10))
     assert set(records['json']) == {'value'}
     #np.testing.assert_array_equal(records['json']['value'], np.array([5, 8, 9, 5, 0, 0, 1, 7, 6, 9]).astype(str))
-    np.testing.assert_array_equal(records['json']['value'], np.array([4, 6, 2, 8, 0, 6, 4, 5, 1, 1]).astype(str))
+    np.testing.assert_array_equal(records['json']['value'], np.array([7, 8, 3, 4, 8, 8, 9, 6, 6, 4]))
+
+async def collect(node, chunk_size):
+    return [arr async for arr in node.generate_chunks(chunk_size)]
+
+def test_chunks(params):
+    n = SerialFixture(min=0, step=2, **params)
+    arr = asyncio.run(collect(n, 3))
+    assert [a.size for a in arr] == [3, 3, 3, 1]
+    np.testing.assert_array_equal(np.concatenate(arr), asyncio.run(n.generate()))
+
+def test_timestamp_chunks(params):
+    n = BaseTime(min=time(0), max=time(23, 59, 59), **params)
+    arr = asyncio.run(collect(n, 4))
+    np.testing.assert_array_equal(np.concatenate(arr), asyncio.run(n.generate()))
+
+def test_sorted_chunks(params):
+    n = FloatFixture(min=0, max=10, name='float', size=1000)
+    n._constraints = {'sorted': [], 'notnull': []}
+    arr = np.concatenate(asyncio.run(collect(n, 64))).astype(float)
+    assert arr.size == 1000
+    assert np.all(np.diff(arr) >= 0)
+    assert arr.min() >= 0 and arr.max() <= 10
+
+def test_sorted_enum_chunks(params):
+    n = types['enum'](options=('c', 'a', 'b'), name='enum', size=100)
+    n._constraints = {'sorted': []}
+    arr = np.concatenate(asyncio.run(collect(n, 7)))
+    assert list(arr) == sorted(arr)
+    assert set(arr) <= {'a', 'b', 'c'}
+
+def test_unique_chunks(params):
+    n = IntegerFixture(min=0, max=100, name='integer', size=50)
+    n._constraints = {'unique': []}
+    arr = np.concatenate(asyncio.run(collect(n, 8)))
+    np.testing.assert_array_equal(arr, asyncio.run(n.generate()))
+
+@pytest.mark.parametrize('node', [
+    IntegerFixture(min=0, max=10, name='integer', size=100),
+    SerialFixture(min=0, step=0, name='serial', size=100),
+    BooleanFixture(name='boolean', size=100),
+    BaseTimestamp(min=datetime(2020, 1, 1), max=datetime(2020, 1, 1), name='timestamp', size=100),
+])
+def test_unique_write(node, tmp_path):
+    node._constraints = {'unique': []}
+    node._path = str(tmp_path)
+    with pytest.raises(AssertionError):
+        asyncio.run(node.write())
+    n = IntegerFixture(min=0, max=1000, name='integer', size=100)
+    n._constraints = {'unique': []}
+    n._path = str(tmp_path)
+    asyncio.run(n.write())
+    assert np.unique(asyncio.run(n.read(0, 100))).size == 100
+
+def test_unique_foreign_write(params, tmp_path):
+    parent = IntegerFixture(min=0, max=100, name='parent', size=100)
+    child = IntegerFixture(min=0, max=10, name='parent.child', size=100)
+    G = nx.DiGraph()
+    G.add_edge(parent, child)
+    n = BaseForeign.from_params(graph=G, depends_on='parent.child', name='foreign', size=100)
+    n._constraints = {'unique': []}
+    n._path = str(tmp_path)
+    with pytest.raises(AssertionError):
+        asyncio.run(n.write())
+
+def test_row_range(params):
+    n = FloatFixture(min=0, max=10, name='float', size=2 * mat.CHUNK_SIZE + 5)
+    n._constraints = {'nullable': [10]}
+    arr = asyncio.run(n.generate())
+    # any row range is drawn on its own from the blocks it overlaps
+    start, stop = mat.CHUNK_SIZE - 3, 2 * mat.CHUNK_SIZE + 2
+    np.testing.assert_array_equal(n.rows(start, stop), arr.data[start:stop])
+    np.testing.assert_array_equal(n.null_mask(start, stop), arr.mask[start:stop])
+    chunks = np.ma.concatenate(asyncio.run(collect(n, 1000)))
+    np.testing.assert_array_equal(chunks.data, arr.data)
+    np.testing.assert_array_equal(chunks.mask, arr.mask)
+
+def test_sorted_chunk_size(params):
+    n = FloatFixture(min=0, max=10, name='float', size=1000)
+    n._constraints = {'sorted': []}
+    np.testing.assert_array_equal(np.concatenate(asyncio.run(collect(n, 64))),
+                                  np.concatenate(asyncio.run(collect(n, 300))))
+
+def test_estimates(params):
+    n = IntegerFixture(min=0, max=100, name='integer', size=2 * mat.CHUNK_SIZE)
+    assert n.nbytes() == 8 * n.size
+    assert n.memory() == 9 * mat.CHUNK_SIZE
+    n._constraints = {'nullable': [10]}
+    assert n.nbytes() == 9 * n.size
+    n = StringFixture(field='word', length=10, **params)
+    assert n.nbytes() == 19 * 10
+    n._constraints = {'sorted': []}
+    assert n.memory() == 41 * 10
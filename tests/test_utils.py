@@ -2,6 +2,13 @@ import pytest
 from pytest import fixture
 from dataclasses import dataclass
 import asyncio
+import json
 from genesynth.model import *
 from genesynth.utils import *
 
+
+def test_stringify():
+    assert json.loads(stringify('{"a": 1, "b": true, "c": "02134", "d": null}\n')) == {'a': '1', 'b': 'true', 'c': '02134', 'd': None}
+    assert stringify('1,2\n') == '1,2\n'
+    record = json.loads(stringify('{"a": {"b": [1, {"c": false}]}, "d": [2.5]}'))
+    assert record == {'a': {'b': ['1', {'c': 'false'}]}, 'd': ['2.5']}
@@ -75,4 +75,47 @@ async def test_runner():
     assert len(runner.executor._processes) <= workers
     assert 1 == await runner.run(Bar().buzz, 1)
     assert len(runner.executor._processes) <= workers
+    pool = runner.executor
+    runner.close()
+    assert runner.pools._process is None and not pool._processes
 
+
+shared = WorkerRegistry()
+
+class Baz:
+    @shared.register
+    async def arange(self, size):
+        return np.ma.MaskedArray(np.arange(size), mask=np.arange(size) % 2 == 0)
+
+    @shared.register
+    async def text(self, size):
+        return np.array(['a', 'bc'] * size)
+
+@pytest.mark.asyncio
+async def test_runner_shared_array():
+    with Runner(registry=shared, workers=1) as runner:
+        arr = await runner.run(Baz().arange, 10)
+        np.testing.assert_array_equal(arr.mask, np.arange(10) % 2 == 0)
+        np.testing.assert_array_equal(arr.data, np.arange(10))
+        assert isinstance(arr.data.base, np.memmap)
+        arr = await runner.run(Baz().text, 2)
+        np.testing.assert_array_equal(arr, ['a', 'bc', 'a', 'bc'])
+        # mapped results no longer need their file
+        assert os.listdir(runner.dir.name) == []
+
+def test_pool_manager():
+    manager = PoolManager(processes=2, threads=3)
+    assert manager._process is None and manager._thread is None
+    runner = Runner(registry=shared, pools=manager)
+    assert runner.max_workers == 2
+    assert runner.executor is manager.process
+    manager.warm()
+    assert len(manager.process._processes) == 2
+    # pools passed in are shared, closing the runner leaves them running
+    runner.close()
+    assert len(manager.process._processes) == 2
+    manager.configure(threads=4)
+    assert manager._process is None and manager.threads == 4
+    assert manager.thread._max_workers == 4
+    manager.shutdown()
+    assert manager._thread is None